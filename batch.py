@@ -0,0 +1,117 @@
+# batch.py
+# Run one job per file on a bounded thread pool, retrying transient errors.
+
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+import requests
+
+from rate_limit import retry_after
+
+TRANSIENT_STATUS = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+TRANSIENT_REQUESTS_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+TRANSIENT_ERRORS = ("APIConnectionError", "APITimeoutError")  # anthropic, which need not be imported here
+MAX_BACKOFF = 60.0
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    """HTTP status of a requests or provider SDK error, if it has one."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def is_transient(error: BaseException) -> bool:
+    """Worth retrying: rate limits, overload and server errors, dropped or timed out connections."""
+    status = status_code(error)
+    if status is not None:
+        return status in TRANSIENT_STATUS
+    # not every OSError: a missing or unreadable file fails the same way on retry
+    return isinstance(error, TRANSIENT_REQUESTS_ERRORS) or any(cls.__name__ in TRANSIENT_ERRORS for cls in type(error).__mro__)
+
+
+def backoff_delay(attempt: int, base: float) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(MAX_BACKOFF, base * 2 ** attempt))
+
+
+@dataclass
+class BatchReport:
+    total: int
+    done: int = 0
+    skipped: int = 0
+    retries: int = 0
+    tokens: int = 0
+    failed: List[Tuple[str, str]] = field(default_factory=list)
+    started: float = field(default_factory=time.perf_counter)
+    elapsed: float = 0.0
+
+    def summary(self) -> str:
+        elapsed = max(self.elapsed, 1e-9)
+        return (
+            f"{self.done} done, {self.skipped} skipped, {len(self.failed)} failed of {self.total} "
+            f"in {self.elapsed:.1f}s ({self.done / elapsed:.2f} files/s, "
+            f"{self.tokens / elapsed:.0f} output tokens/s, {self.retries} retries)"
+        )
+
+
+def run_batch(
+    paths: List[str],
+    process: Callable[[str], Optional[int]],
+    workers: int,
+    retries: int = 3,
+    backoff: float = 1.0,
+    on_result: Optional[Callable[[str, str, BatchReport], None]] = None
+) -> BatchReport:
+    """
+    Call process(path) for every path on at most workers threads. process
+    returns the tokens it produced, or None to skip the file. Transient errors
+    are retried up to retries times with backoff; anything else fails the
+    file without stopping the batch. on_result(path, outcome, report) is
+    called as each file finishes, outcome being "done", "skipped" or the error.
+    """
+    report = BatchReport(len(paths))
+    lock = threading.Lock()
+
+    def attempt(path: str) -> Optional[int]:
+        for attempt_number in range(retries + 1):
+            try:
+                return process(path)
+            except Exception as e:
+                if attempt_number == retries or not is_transient(e):
+                    raise
+                with lock:
+                    report.retries += 1
+                time.sleep(max(backoff_delay(attempt_number, backoff), retry_after(e) or 0.0))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="llt-batch") as executor:
+        futures = {executor.submit(attempt, path): path for path in paths}
+        try:
+            for future in as_completed(futures):
+                path = futures[future]
+                error = future.exception()
+                with lock:
+                    if error is not None:
+                        report.failed.append((path, f"{type(error).__name__}: {error}"))
+                        outcome = report.failed[-1][1]
+                    elif future.result() is None:
+                        report.skipped += 1
+                        outcome = "skipped"
+                    else:
+                        report.done += 1
+                        report.tokens += future.result()
+                        outcome = "done"
+                    report.elapsed = time.perf_counter() - report.started
+                if on_result:
+                    on_result(path, outcome, report)
+        except KeyboardInterrupt:
+            for future in futures:
+                future.cancel()
+            raise
+    report.elapsed = time.perf_counter() - report.started
+    return report
@@ -0,0 +1,92 @@
+# benchmarks/bench_codecs.py
+# Load/save throughput and on-disk size of each conversation codec.
+#
+#   python benchmarks/bench_codecs.py [--conversations 200] [--messages 60]
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ll_codecs  # noqa: E402
+
+WORDS = "the model returns a list of tokens and each token maps to an id in the vocabulary".split()
+
+
+def synthetic_conversation(n_messages: int, rng: random.Random) -> list:
+    messages = [{"role": "system", "content": "You are a helpful assistant."}]
+    for i in range(n_messages):
+        role = "user" if i % 2 == 0 else "assistant"
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 400)))
+        if role == "assistant" and rng.random() < 0.3:
+            text += "\n```python\n" + "\n".join(f"x{j} = {j} * 2" for j in range(rng.randint(3, 30))) + "\n```"
+        messages.append({"role": role, "content": text})
+    return messages
+
+
+def json_write(path: str, messages: list) -> None:
+    with open(path, "w") as f:
+        json.dump(messages, f, indent=2)
+
+
+def json_read(path: str) -> list:
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def bench(conversations: list, directory: str) -> None:
+    formats = [("json (.ll)", ".ll", json_write, json_read)]
+    for codec in ll_codecs.CODECS.values():
+        if codec.name == "zstd" and ll_codecs.zstandard is None:
+            print("zstd: skipped (zstandard not installed)")
+            continue
+        formats.append((
+            codec.name, codec.extension,
+            lambda path, messages, codec=codec: ll_codecs.write(path, messages, codec),
+            lambda path, codec=codec: list(ll_codecs.read(path, codec)),
+        ))
+
+    total_messages = sum(len(c) for c in conversations)
+    print(f"{len(conversations)} conversations, {total_messages} messages")
+    print(f"{'format':14} {'save msg/s':>12} {'load msg/s':>12} {'size KiB':>10} {'ratio':>7}")
+    baseline = None
+    for name, extension, write, read in formats:
+        paths = [os.path.join(directory, f"c{i}{extension}") for i in range(len(conversations))]
+
+        start = time.perf_counter()
+        for path, messages in zip(paths, conversations):
+            write(path, messages)
+        save = time.perf_counter() - start
+
+        start = time.perf_counter()
+        loaded = [read(path) for path in paths]
+        load = time.perf_counter() - start
+
+        if loaded != conversations:
+            raise AssertionError(f"{name} did not round-trip")
+        size = sum(os.path.getsize(path) for path in paths)
+        baseline = baseline or size
+        print(f"{name:14} {total_messages / save:12.0f} {total_messages / load:12.0f} "
+              f"{size / 1024:10.0f} {size / baseline:7.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load/save throughput and on-disk size of each conversation codec.")
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    conversations = [synthetic_conversation(args.messages, rng) for _ in range(args.conversations)]
+    with tempfile.TemporaryDirectory() as directory:
+        bench(conversations, directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# benchmarks/bench_messages.py
+# Memory per message and load time of Message records vs plain dicts.
+#
+#   python benchmarks/bench_messages.py [--messages 100000]
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history import Conversation, Message  # noqa: E402
+import journal  # noqa: E402
+
+
+def synthetic_messages(n: int, rng: random.Random) -> list:
+    roles = ["user", "assistant"]
+    return [
+        {"role": roles[i % 2], "content": "word " * rng.randint(5, 60)}
+        for i in range(n)
+    ]
+
+
+def measure(label: str, build, n: int) -> None:
+    """Time one build, then measure the memory it retains in a second, traced build."""
+    start = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    print(f"{label:36} {current / n:8.1f} B/msg {elapsed * 1000:9.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Memory per message and load time of Message records vs plain dicts.")
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    n = args.messages
+    messages = synthetic_messages(n, random.Random(args.seed))
+    text = json.dumps(messages, indent=2)
+    content_bytes = sum(sys.getsizeof(m["content"]) for m in messages) / n
+    print(f"{n} messages, content strings average {content_bytes:.1f} B")
+
+    # memory includes the content strings, which both representations share in size
+    measure("json.loads -> dicts", lambda: json.loads(text), n)
+    measure("json.loads -> Message records", lambda: [Message(m) for m in json.loads(text)], n)
+    measure("json.loads -> Conversation", lambda: Conversation(json.loads(text)), n)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.ll")
+        with open(path, "w") as f:
+            f.write(text)
+        measure("journal.read_messages (indexed)", lambda: journal.read_messages(path), n)
+        measure("  ... and resolving every message", lambda: list(journal.read_messages(path)), n)
+
+    conversation = Conversation(messages)
+    if json.dumps(conversation.to_list(), default=dict, indent=2) != text:
+        raise AssertionError("Message records do not serialize to the same JSON")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# benchmarks/bench_sse.py
+# Parse overhead per token of the streamed completion reader: the old
+# iter_lines loop vs sse.ChatStream, in memory and against a local fake
+# OpenAI-compatible streaming server.
+#
+#   python benchmarks/bench_sse.py [--tokens 20000] [--chunk 512]
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sse  # noqa: E402
+
+
+def fake_stream(tokens: int) -> bytes:
+    """An OpenAI-style stream with keep-alive comments, a usage chunk and [DONE]."""
+    events = []
+    for i in range(tokens):
+        if i % 100 == 0:
+            events.append(b": keep-alive\n\n")
+        chunk = {"id": "x", "object": "chat.completion.chunk", "model": "fake",
+                 "choices": [{"index": 0, "delta": {"content": f"tok{i} "}, "finish_reason": None}]}
+        events.append(b"data: " + json.dumps(chunk).encode() + b"\n\n")
+    events.append(b"data: " + json.dumps({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}).encode() + b"\n\n")
+    events.append(b"data: " + json.dumps({"choices": [], "usage": {"completion_tokens": tokens}}).encode() + b"\n\n")
+    events.append(b"data: [DONE]\n\n")
+    return b"".join(events)
+
+
+def legacy_read(lines) -> str:
+    """The loop send_request used before sse.ChatStream."""
+    full_response_content = ""
+    for chunk in lines:
+        if chunk:
+            decoded_chunk = chunk.decode("utf-8")
+            if decoded_chunk.startswith("data: [DONE]"):
+                break
+            if decoded_chunk.startswith("data: "):
+                json_data = json.loads(decoded_chunk[len("data: "):])
+                choice = json_data["choices"][0]
+                if choice["finish_reason"] is None:
+                    full_response_content += choice["delta"].get("content") or ""
+                if choice["finish_reason"] == "stop":
+                    break
+    return full_response_content
+
+
+def stream_read(chunks) -> str:
+    return sse.ChatStream().consume(chunks).message()["content"]
+
+
+def split_lines(chunks):
+    """requests.Response.iter_lines over in-memory chunks."""
+    pending = None
+    for chunk in chunks:
+        if pending is not None:
+            chunk = pending + chunk
+        lines = chunk.splitlines()
+        pending = lines.pop() if lines and lines[-1] and chunk[-1:] == lines[-1][-1:] else None
+        yield from lines
+    if pending is not None:
+        yield pending
+
+
+def best_of(runs: int, fn) -> float:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def serve(body: bytes, chunk: int) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            for i in range(0, len(body), chunk):
+                self.wfile.write(body[i:i + chunk])
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Parse overhead per token of the streamed completion reader.")
+    parser.add_argument("--tokens", type=int, default=20_000)
+    parser.add_argument("--chunk", type=int, default=512, help="bytes per network chunk")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    body = fake_stream(args.tokens)
+    chunks = [body[i:i + args.chunk] for i in range(0, len(body), args.chunk)]
+    expected = "".join(f"tok{i} " for i in range(args.tokens))
+    if legacy_read(split_lines(chunks)) != expected or stream_read(chunks) != expected:
+        raise AssertionError("Readers disagree on the streamed text")
+    print(f"{args.tokens} tokens, {len(body) / 1024:.0f} KiB in {len(chunks)} chunks of {args.chunk} B")
+
+    payloads = [line[len(b"data: "):].decode() for line in body.split(b"\n") if line.startswith(b"data: {")]
+
+    def decode_only():
+        for payload in payloads:
+            json.loads(payload)
+
+    baseline = best_of(args.runs, decode_only)
+    print(f"{'json.loads of the payloads alone':34} {baseline * 1000:8.1f} ms {baseline / args.tokens * 1e6:6.2f} us/token")
+
+    for label, fn in [
+        ("in memory: iter_lines loop", lambda: legacy_read(split_lines(chunks))),
+        ("in memory: sse.ChatStream", lambda: stream_read(chunks)),
+    ]:
+        elapsed = best_of(args.runs, fn)
+        overhead = (elapsed - baseline) / args.tokens * 1e6
+        print(f"{label:34} {elapsed * 1000:8.1f} ms {elapsed / args.tokens * 1e6:6.2f} us/token"
+              f" ({overhead:+.2f} us/token parse overhead)")
+
+    server = serve(body, args.chunk)
+    url = f"http://127.0.0.1:{server.server_port}/v1/chat/completions"
+    session = requests.Session()
+
+    def over_http(reader, lines: bool):
+        with session.post(url, json={"stream": True}, stream=True) as response:
+            chunks = response.iter_lines() if lines else response.iter_content(chunk_size=None)
+            return reader(chunks)
+
+    for label, fn in [
+        ("local server: iter_lines loop", lambda: over_http(legacy_read, True)),
+        ("local server: sse.ChatStream", lambda: over_http(stream_read, False)),
+    ]:
+        elapsed = best_of(args.runs, fn)
+        print(f"{label:34} {elapsed * 1000:8.1f} ms {elapsed / args.tokens * 1e6:6.2f} us/token")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
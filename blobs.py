@@ -0,0 +1,90 @@
+# blobs.py
+# Content-addressed store for images and other large payloads.
+#
+# Blobs live under $LLT_PATH/blobs/<aa>/<sha256> as raw bytes. Messages hold
+# a reference "llt-blob:<sha256>" in the place the base64 data would go:
+#   {"type": "image", "source": {"type": "base64", "media_type": "image/png", "data": "llt-blob:<sha256>"}}
+#   {"type": "image_url", "image_url": {"url": "data:image/png;base64,llt-blob:<sha256>"}}
+# materialize() swaps the base64 back in when a provider payload is built.
+
+import os
+import base64
+import hashlib
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+BLOB_PREFIX = "llt-blob:"
+
+
+def blob_dir() -> Optional[str]:
+    llt_path = os.getenv("LLT_PATH")
+    return os.path.join(llt_path, "blobs") if llt_path else None
+
+
+def blob_path(digest: str) -> str:
+    return os.path.join(blob_dir(), digest[:2], digest)
+
+
+def put(data: bytes) -> Optional[str]:
+    """Store data once and return its reference, or None when there is no LLT_PATH."""
+    if blob_dir() is None:
+        return None
+    digest = hashlib.sha256(data).hexdigest()
+    path = blob_path(digest)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return BLOB_PREFIX + digest
+
+
+def put_file(file_path: str) -> Optional[str]:
+    with open(file_path, "rb") as f:
+        return put(f.read())
+
+
+def is_ref(value: Any) -> bool:
+    return isinstance(value, str) and value.startswith(BLOB_PREFIX)
+
+
+@lru_cache(maxsize=32)
+def get_base64(ref: str) -> str:
+    """Base64 of a referenced blob; recently used images stay encoded in memory."""
+    with open(blob_path(ref[len(BLOB_PREFIX):]), "rb") as f:
+        return base64.b64encode(f.read()).decode("utf-8")
+
+
+def image_part(ref_or_base64: str, media_type: str, style: str) -> Dict[str, Any]:
+    """Content part for an image in the given provider style ("anthropic" or "openai")."""
+    if style == "anthropic":
+        return {
+            "type": "image",
+            "source": {"type": "base64", "media_type": media_type, "data": ref_or_base64},
+        }
+    return {"type": "image_url", "image_url": {"url": f"data:{media_type};base64,{ref_or_base64}"}}
+
+
+def _materialize_part(part: Any) -> Any:
+    if not isinstance(part, dict):
+        return part
+    if part.get("type") == "image" and is_ref(part.get("source", {}).get("data")):
+        return {**part, "source": {**part["source"], "data": get_base64(part["source"]["data"])}}
+    if part.get("type") == "image_url":
+        url = part.get("image_url", {}).get("url", "")
+        head, _, payload = url.partition(";base64,")
+        if is_ref(payload):
+            return {**part, "image_url": {**part["image_url"], "url": f"{head};base64,{get_base64(payload)}"}}
+    return part
+
+
+def materialize(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Message with blob references replaced by base64; unchanged messages are returned as is."""
+    content = message.get("content")
+    if not isinstance(content, list):
+        return message
+    parts = [_materialize_part(part) for part in content]
+    if all(new is old for new, old in zip(parts, content)):
+        return message
+    return {**message, "content": parts}
@@ -0,0 +1,139 @@
+# command_log.py
+# Asynchronous, batched command log with splice (delta) records and rotation.
+
+import os
+import gzip
+import json
+import time
+import queue
+import atexit
+import shutil
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from history import Conversation, LazyRecord, json_default, splice_kind
+
+
+class CommandLog:
+    """
+    Append one compact JSONL record per command from a background thread.
+
+    Callers only enqueue immutable conversation snapshots, so logging costs
+    O(1) on the command path. The writer thread diffs before/after into a
+    single splice (at, removed, added) and writes batches; the log therefore
+    grows with the number of changed messages, not the conversation length.
+    Files over max_bytes are rotated to <name>.<timestamp>.gz.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str],
+        max_queue: int = 1000,
+        batch_size: int = 100,
+        flush_interval: float = 0.5,
+        max_bytes: int = 10 * 1024 * 1024,
+        keep_rotated: int = 5
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.keep_rotated = keep_rotated
+        self.queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.thread: Optional[threading.Thread] = None
+
+    def _start(self) -> None:
+        self.thread = threading.Thread(target=self._writer, name="llt-command-log", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def log_command(self, cmd: str, before: Conversation, after: Conversation, args: Any) -> None:
+        """Enqueue a command record; never blocks. Records are dropped if the queue is full."""
+        if not self.path:
+            return
+        if self.thread is None:
+            self._start()
+        context = {"model": getattr(args, "model", None), "ll": getattr(args, "load", None)}
+        try:
+            self.queue.put_nowait((time.time(), cmd, before.snapshot(), after.snapshot(), context))
+        except queue.Full:
+            self.dropped += 1
+
+    @staticmethod
+    def reference(item: Any) -> Any:
+        """Messages as they are; lazy records from an indexed .ll file as a reference to their bytes."""
+        if isinstance(item, LazyRecord):
+            source = getattr(item.source, "path", None)
+            return {"ref": {"path": source, "offset": item.offset, "length": item.length, "digest": item.digest}}
+        return item
+
+    @classmethod
+    def make_record(cls, t: float, cmd: str, before: Conversation, after: Conversation, context: Dict) -> Dict:
+        # unresolved: loading an indexed file must not parse, or log, every message in it
+        at, removed, added = before.diff(after, resolve=False)
+        op = splice_kind(len(before), at, removed, added)
+        record = {"t": round(t, 3), "cmd": cmd, "op": op, "len": len(after), **context}
+        if op != "none":
+            record.update(at=at, removed=removed, added=[cls.reference(item) for item in added])
+        return record
+
+    def _write_batch(self, batch: List[tuple]) -> None:
+        lines = []
+        for item in batch:
+            record = self.make_record(*item)
+            if self.dropped:
+                record["dropped"], self.dropped = self.dropped, 0
+            lines.append(json.dumps(record, separators=(",", ":"), default=json_default))
+        with open(self.path, "a") as logfile:
+            logfile.write("\n".join(lines) + "\n")
+        if os.path.getsize(self.path) > self.max_bytes:
+            self._rotate()
+
+    def _rotate(self) -> None:
+        rotated = f"{self.path}.{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.gz"
+        with open(self.path, "rb") as src, gzip.open(rotated, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(self.path)
+
+        directory = os.path.dirname(self.path) or "."
+        prefix = os.path.basename(self.path) + "."
+        old = sorted(f for f in os.listdir(directory) if f.startswith(prefix) and f.endswith(".gz"))
+        for name in old[:-self.keep_rotated]:
+            os.remove(os.path.join(directory, name))
+
+    def _writer(self) -> None:
+        while True:
+            item = self.queue.get()
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while item is not None and len(batch) < self.batch_size:
+                try:
+                    item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                batch.append(item)
+            records = [b for b in batch if b is not None]
+            if records:
+                try:
+                    self._write_batch(records)
+                except Exception as e:
+                    print(f"Failed to write command log {self.path}: {e}")
+            if batch[-1] is None:
+                return
+
+    def close(self, timeout: float = 2.0) -> None:
+        """Flush pending records and stop the writer thread."""
+        if self.thread is None or not self.thread.is_alive():
+            return
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self.thread.join(timeout)
+
+
+command_log = CommandLog(
+    os.path.join(os.environ["LLT_PATH"], "llt_shell.jsonl") if os.getenv("LLT_PATH") else None
+)
@@ -0,0 +1,198 @@
+# completion_cache.py
+# Opt-in on-disk cache of completions for repeatable requests.
+#
+# Entries live under $LLT_PATH/completions/<aa>/<key>.json, where key is the
+# sha256 of the canonical request (provider, model, messages, temperature,
+# max_tokens, top_p). Images are hashed as their llt-blob references, so the
+# key never needs the base64. A hit refreshes the entry's mtime; when the
+# cache grows past max_bytes the least recently used entries are evicted.
+# stats.json keeps hit/miss counts and the cache size across runs; counts are
+# kept in memory and written at most every FLUSH_SECONDS and at exit.
+#
+# Only deterministic requests are cached (run_completion checks temperature
+# 0): at any other temperature a cached reply would replace a fresh sample.
+
+import os
+import json
+import atexit
+import time
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+EVICT_TO = 0.9  # fraction of max_bytes left after an eviction pass
+STATS_FIELDS = ("hits", "misses", "stores", "evictions", "bytes")
+FLUSH_SECONDS = 5.0
+
+_lock = threading.Lock()
+_saved: Optional[Dict[str, int]] = None  # stats.json as last read or written
+_pending: Dict[str, int] = {}  # deltas not yet written
+_flushed_at = time.monotonic()
+
+
+def cache_dir() -> Optional[str]:
+    llt_path = os.getenv("LLT_PATH")
+    return os.path.join(llt_path, "completions") if llt_path else None
+
+
+def entry_path(key: str) -> str:
+    return os.path.join(cache_dir(), key[:2], f"{key}.json")
+
+
+def request_key(
+    provider: str,
+    model: str,
+    messages: List[Dict[str, Any]],
+    temperature: float,
+    max_tokens: int,
+    top_p: float
+) -> str:
+    """sha256 of the request in canonical JSON: sorted keys, no whitespace."""
+    request = {
+        "provider": provider,
+        "model": model,
+        "messages": [dict(message) for message in messages],
+        "temperature": float(temperature),
+        "max_tokens": int(max_tokens),
+        "top_p": float(top_p),
+    }
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=dict)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _read_stats() -> Dict[str, int]:
+    try:
+        with open(os.path.join(cache_dir(), "stats.json")) as f:
+            saved = json.load(f)
+    except (OSError, ValueError, TypeError):
+        saved = {}
+    return {field: int(saved.get(field, 0)) for field in STATS_FIELDS}
+
+
+def _totals() -> Dict[str, int]:
+    """Saved stats plus pending deltas; call with _lock held."""
+    global _saved
+    if _saved is None:
+        _saved = _read_stats()
+    return {field: max(0, _saved[field] + _pending.get(field, 0)) for field in STATS_FIELDS}
+
+
+def _flush() -> None:
+    """Add pending deltas to stats.json, which other processes may have updated; call with _lock held."""
+    global _saved, _flushed_at
+    if _pending:
+        current = _read_stats()
+        for field, delta in _pending.items():
+            current[field] = max(0, current[field] + delta)
+        _write_atomic(os.path.join(cache_dir(), "stats.json"), json.dumps(current).encode("utf-8"))
+        _saved = current
+        _pending.clear()
+    _flushed_at = time.monotonic()
+
+
+def _record(**deltas: int) -> Dict[str, int]:
+    """Add deltas to the stats, writing them out every FLUSH_SECONDS; call with _lock held."""
+    for field, delta in deltas.items():
+        _pending[field] = _pending.get(field, 0) + delta
+    if time.monotonic() - _flushed_at >= FLUSH_SECONDS:
+        _flush()
+    return _totals()
+
+
+def flush() -> None:
+    if cache_dir() is not None and _pending:
+        with _lock:
+            _flush()
+
+
+atexit.register(flush)
+
+
+def stats() -> Dict[str, int]:
+    with _lock:
+        _flush()
+        return _totals()
+
+
+def get(key: str) -> Optional[Dict[str, Any]]:
+    """Cached completion for key, or None; counts a hit or a miss."""
+    if cache_dir() is None:
+        return None
+    path = entry_path(key)
+    with _lock:
+        try:
+            with open(path, "rb") as f:
+                entry = json.loads(f.read())
+            os.utime(path)
+        except (OSError, ValueError):
+            _record(misses=1)
+            return None
+        _record(hits=1)
+    return entry["completion"]
+
+
+def put(key: str, completion: Dict[str, Any], max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+    """Store completion under key, evicting least recently used entries past max_bytes."""
+    if cache_dir() is None:
+        return
+    path = entry_path(key)
+    data = json.dumps({"created": time.time(), "completion": dict(completion)}, default=dict).encode("utf-8")
+    with _lock:
+        try:
+            previous = os.path.getsize(path)
+        except OSError:
+            previous = 0
+        _write_atomic(path, data)
+        current = _record(stores=1, bytes=len(data) - previous)
+        if current["bytes"] > max_bytes:
+            _evict(int(max_bytes * EVICT_TO))
+
+
+def _entries() -> List[os.DirEntry]:
+    entries = []
+    for shard in os.scandir(cache_dir()):
+        if shard.is_dir():
+            entries.extend(entry for entry in os.scandir(shard.path) if entry.name.endswith(".json"))
+    return entries
+
+
+def _evict(target_bytes: int) -> None:
+    """Delete the oldest entries by mtime until the cache is at most target_bytes; call with _lock held."""
+    entries = []
+    for entry in _entries():
+        stat = entry.stat()  # one stat per entry
+        entries.append((stat.st_mtime, stat.st_size, entry.path))
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    evicted = 0
+    for _, size, path in entries:
+        if total <= target_bytes:
+            break
+        os.remove(path)
+        total -= size
+        evicted += 1
+    _record(evictions=evicted, bytes=total - _totals()["bytes"])
+
+
+def clear() -> int:
+    """Remove every entry and reset the stats; returns the number removed."""
+    global _saved
+    if cache_dir() is None or not os.path.isdir(cache_dir()):
+        return 0
+    with _lock:
+        entries = _entries()
+        for entry in entries:
+            os.remove(entry.path)
+        _write_atomic(os.path.join(cache_dir(), "stats.json"), json.dumps({}).encode("utf-8"))
+        _pending.clear()
+        _saved = None
+    return len(entries)
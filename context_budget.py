@@ -0,0 +1,142 @@
+# context_budget.py
+# Fit a conversation into a model's context window before it is sent.
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from token_ledger import count_message
+
+DEFAULT_CONTEXT_WINDOW = 128_000
+POLICIES = ("images", "tools", "oldest")
+DEFAULT_POLICY = ",".join(POLICIES)
+TOOL_OUTPUT_KEEP = 2000  # characters kept from each end of a truncated tool output
+ELIDED_IMAGE = {"type": "text", "text": "[image elided to fit the context window]"}
+
+
+def context_window(model: str, providers: Dict[str, Any]) -> int:
+    """
+    Context window of model from config. A provider may list windows per model
+    name under context_windows and a default for its other models under
+    context_window:
+
+        anthropic:
+          context_window: 200000
+          context_windows:
+            claude-3-haiku: 100000
+    """
+    for details in providers.values():
+        names = [
+            f"{name}-{version}"
+            for name, versions in details.get("models", {}).items()
+            for version in versions
+        ]
+        if model in names:
+            windows = details.get("context_windows") or {}
+            return int(windows.get(model) or details.get("context_window") or DEFAULT_CONTEXT_WINDOW)
+    return DEFAULT_CONTEXT_WINDOW
+
+
+def parse_policy(policy: Optional[str]) -> List[str]:
+    """Policy steps in order, e.g. "tools,oldest"; "none" disables trimming."""
+    steps = [step.strip() for step in (policy or DEFAULT_POLICY).split(",") if step.strip()]
+    if steps == ["none"]:
+        return []
+    unknown = [step for step in steps if step not in POLICIES]
+    if unknown:
+        raise ValueError(f"Unknown context policy step(s): {', '.join(unknown)}; expected {', '.join(POLICIES)} or none")
+    return steps
+
+
+def _elide_images(message: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+    content = message.get("content")
+    if not isinstance(content, list):
+        return message, 0
+    elided = sum(part.get("type") in ("image", "image_url") for part in content)
+    parts = [ELIDED_IMAGE if part.get("type") in ("image", "image_url") else part for part in content]
+    return ({**message, "content": parts}, elided) if elided else (message, 0)
+
+
+def _truncate_text(text: str) -> str:
+    if len(text) <= 2 * TOOL_OUTPUT_KEEP:
+        return text
+    omitted = len(text) - 2 * TOOL_OUTPUT_KEEP
+    return f"{text[:TOOL_OUTPUT_KEEP]}\n[... {omitted} characters truncated ...]\n{text[-TOOL_OUTPUT_KEEP:]}"
+
+
+def _truncate_tool_output(message: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+    content = message.get("content")
+    if message.get("role") == "tool" and isinstance(content, str):
+        truncated = _truncate_text(content)
+        return ({**message, "content": truncated}, 1) if truncated != content else (message, 0)
+    if isinstance(content, list) and any(part.get("type") == "tool_result" for part in content):
+        parts, changed = [], 0
+        for part in content:
+            if part.get("type") == "tool_result" and isinstance(part.get("content"), str):
+                truncated = _truncate_text(part["content"])
+                if truncated != part["content"]:
+                    part, changed = {**part, "content": truncated}, changed + 1
+            parts.append(part)
+        return ({**message, "content": parts}, changed) if changed else (message, 0)
+    return message, 0
+
+
+def fit_to_budget(
+    messages: List[Dict[str, Any]],
+    model: str,
+    budget: int,
+    policy: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], List[str], int]:
+    """
+    Trim messages until their token count fits budget, applying the policy
+    steps in order and stopping as soon as it fits:
+
+      images  replace image parts with a placeholder, oldest first
+      tools   keep the head and tail of long tool outputs, oldest first
+      oldest  drop the oldest non-system turns
+
+    The last message is never changed. Returns the trimmed list, a report of
+    what was trimmed and the final token count, which is still over budget
+    when the policy could not trim enough.
+    """
+    messages = list(messages)
+    counts = [count_message(message, model) for message in messages]
+    total = sum(counts)
+    before = total
+    report: List[str] = []
+    last = len(messages) - 1
+
+    for step in parse_policy(policy):
+        if total <= budget:
+            break
+        if step in ("images", "tools"):
+            transform = _elide_images if step == "images" else _truncate_tool_output
+            trimmed = 0
+            for i in range(last):
+                if total <= budget:
+                    break
+                message, n = transform(messages[i])
+                if n:
+                    count = count_message(message, model)
+                    total += count - counts[i]
+                    messages[i], counts[i] = message, count
+                    trimmed += n
+            if trimmed:
+                report.append(f"elided {trimmed} image(s)" if step == "images" else f"truncated {trimmed} tool output(s)")
+        else:
+            dropped = set()
+            for i in range(last):
+                if messages[i].get("role") == "system":
+                    continue
+                # drop whole turns, so the kept history still starts with a user message
+                if total <= budget and messages[i].get("role") == "user":
+                    break
+                dropped.add(i)
+                total -= counts[i]
+            if dropped:
+                messages = [message for i, message in enumerate(messages) if i not in dropped]
+                counts = [count for i, count in enumerate(counts) if i not in dropped]
+                last = len(messages) - 1
+                report.append(f"dropped {len(dropped)} oldest message(s)")
+
+    if report:
+        report.append(f"{before:,} -> {total:,} tokens (budget {budget:,})")
+    return messages, report, total
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# daemon.py
+# Long-lived llt server and thin client over a Unix domain socket.
+#
+#   python daemon.py serve                     start the daemon
+#   python daemon.py stop                      shut it down
+#   python daemon.py --load x --complete -w .  run llt args inside the daemon
+#
+# The client only imports the standard library; if no daemon is listening
+# it falls back to running main.llt() in-process.
+
+import os
+import sys
+import json
+import socket
+import traceback
+from contextlib import redirect_stdout, redirect_stderr
+from io import StringIO, TextIOBase
+from typing import List, Dict, Optional, Callable
+
+
+def socket_path() -> str:
+    return os.getenv("LLT_SOCKET") or os.path.join(os.getenv("LLT_PATH", ""), "llt.sock")
+
+
+def _send_frame(conn: socket.socket, frame: Dict) -> None:
+    conn.sendall(json.dumps(frame).encode("utf-8") + b"\n")
+
+
+class _SocketWriter(TextIOBase):
+    """File-like object that streams printed output back to the client."""
+
+    def __init__(self, conn: socket.socket):
+        self.conn = conn
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if text:
+            _send_frame(self.conn, {"out": text})
+        return len(text)
+
+
+class Session:
+    """Snapshot of a .ll file as last loaded or written, keyed by path."""
+
+    def __init__(self, path: str, messages: List[Dict]):
+        from history import Conversation
+
+        stat = os.stat(path)
+        self.path = path
+        self.mtime, self.size = stat.st_mtime, stat.st_size
+        self.messages = Conversation(messages).snapshot()
+
+    def is_current(self) -> bool:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        return (stat.st_mtime, stat.st_size) == (self.mtime, self.size)
+
+    def checkout(self) -> List[Dict]:
+        return self.messages.snapshot()
+
+
+class LLTDaemon:
+    """Holds the plugin registry, cmd_map and loaded sessions across requests."""
+
+    def __init__(self, plugin_dir: str, path: str):
+        from main import parse_arguments
+        from plugins import load_plugins, add_plugin_arguments, init_cmd_map, _plugins_registry
+
+        self.path = path
+        self.sessions: Dict[str, Session] = {}
+        load_plugins(plugin_dir, lazy=False)
+        self.parser = parse_arguments()
+        add_plugin_arguments(self.parser)
+
+        cmd_map = init_cmd_map()
+        wrappers = {
+            _plugins_registry["load"]["function"]: self._session_load,
+            _plugins_registry["write"]["function"]: self._session_write,
+        }
+        self.cmd_map = {
+            name: wrappers[fn](fn) if fn in wrappers else fn
+            for name, fn in cmd_map.items()
+        }
+
+    def _session_load(self, load_fn: Callable) -> Callable:
+        def load(messages, args, index=-1):
+            ll_path = os.path.join(args.ll_dir, args.load)
+            session = self.sessions.get(ll_path)
+            if session and session.is_current():
+                args.load = ll_path
+                print(f"Reusing session for '{ll_path}' ({len(session.messages)} messages).")
+                return session.checkout()
+            messages = load_fn(messages, args, index)
+            if os.path.exists(ll_path):
+                self.sessions[ll_path] = Session(ll_path, messages)
+            return messages
+        return load
+
+    def _session_write(self, write_fn: Callable) -> Callable:
+        def write(messages, args, index=-1):
+            messages = write_fn(messages, args, index)
+            self.sessions[args.write] = Session(args.write, messages)
+            return messages
+        return write
+
+    def run(self, request: Dict) -> int:
+        """Parse argv into the startup command queue and run it; returns message count."""
+        from main import init_directories, execute_command
+        from plugins import schedule_startup_commands, ScheduledCommand
+
+        args = self.parser.parse_args(request.get("argv", []))
+        args.non_interactive = True
+        init_directories(args)
+
+        command_queue = schedule_startup_commands(args)
+        for cmd in request.get("commands", []):
+            command_queue.append(ScheduledCommand(cmd["name"], cmd.get("index", -1)))
+
+        messages = []
+        while command_queue:
+            cmd = command_queue.popleft()
+            messages = execute_command(self.cmd_map, cmd.name, messages, args, cmd.index, command_queue)
+        return len(messages)
+
+    def handle(self, conn: socket.socket) -> bool:
+        """Serve one client connection. Returns False when asked to shut down."""
+        with conn, conn.makefile("r", encoding="utf-8") as reader:
+            line = reader.readline()
+            if not line:
+                return True
+            request = json.loads(line)
+            if request.get("shutdown"):
+                _send_frame(conn, {"done": True, "ok": True})
+                return False
+
+            writer = _SocketWriter(conn)
+            ok, count = True, 0
+            cwd = os.getcwd()
+            stdin = sys.stdin
+            try:
+                os.chdir(request.get("cwd", cwd))
+                # no terminal behind the daemon: prompts fail fast instead of blocking
+                sys.stdin = StringIO()
+                with redirect_stdout(writer), redirect_stderr(writer):
+                    try:
+                        count = self.run(request)
+                    except SystemExit as e:
+                        ok = e.code in (0, None)
+                    except Exception as e:
+                        ok = False
+                        print(f"An error occurred: {e}\n{traceback.format_exc()}")
+            finally:
+                sys.stdin = stdin
+                os.chdir(cwd)
+            _send_frame(conn, {"done": True, "ok": ok, "messages": count})
+        return True
+
+    def serve(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+            server.bind(self.path)
+            server.listen()
+            print(f"llt daemon listening on {self.path}")
+            try:
+                while True:
+                    conn, _ = server.accept()
+                    try:
+                        if not self.handle(conn):
+                            break
+                    except (OSError, ValueError) as e:
+                        print(f"Client connection failed: {e}")
+            finally:
+                os.remove(self.path)
+
+
+def client(argv: List[str], path: Optional[str] = None, request: Optional[Dict] = None) -> int:
+    """Forward argv to the daemon and stream its output. Raises OSError if it is not running."""
+    request = request or {"argv": argv, "cwd": os.getcwd()}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.connect(path or socket_path())
+        _send_frame(conn, request)
+        with conn.makefile("r", encoding="utf-8") as reader:
+            for line in reader:
+                frame = json.loads(line)
+                if "out" in frame:
+                    sys.stdout.write(frame["out"])
+                    sys.stdout.flush()
+                if frame.get("done"):
+                    return 0 if frame.get("ok") else 1
+    return 1
+
+
+def main() -> int:
+    argv = sys.argv[1:]
+    if argv[:1] == ["serve"]:
+        plugin_dir = os.path.join(os.getenv("LLT_DIR", os.path.dirname(os.path.abspath(__file__))), "plugins")
+        LLTDaemon(plugin_dir, socket_path()).serve()
+        return 0
+    if argv[:1] == ["stop"]:
+        try:
+            return client([], request={"shutdown": True})
+        except (FileNotFoundError, ConnectionRefusedError):
+            print("No llt daemon running.")
+            return 1
+
+    try:
+        return client(argv)
+    except (FileNotFoundError, ConnectionRefusedError):
+        import main as llt_main
+        sys.argv = [sys.argv[0], *argv]
+        llt_main.llt()
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+# hedging.py
+# Hedged completions: when the primary model has not produced a first token
+# by the deadline, the same request goes to a backup model; whichever stream
+# starts first is shown and the other is cancelled. Streams opened inside
+# cancellable() are aborted as soon as their attempt loses, so a stalled
+# loser gives back its connection and rate limiter slot at once.
+#
+# Configured in config.yaml and enabled with --hedge:
+#
+#   hedging:
+#     deadline: 2.0              # seconds to wait for the primary's first token
+#     backups:
+#       deepseek-chat: gpt-4o-mini
+#
+# Counts of hedged requests, fired hedges and backup wins are kept in
+# $LLT_PATH/hedging.json.
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+DEFAULT_DEADLINE = 2.0
+
+_current = threading.local()  # the Attempt running on this thread, if any
+
+
+class HedgeCancelled(Exception):
+    """Raised inside the losing stream's text callback to stop it."""
+
+
+class Attempt:
+    """One streamed completion on its own thread, buffered until it is chosen."""
+
+    def __init__(self, model: str, run: Callable, changed: threading.Condition, show: Callable[[str], None]):
+        self.model = model
+        self.changed = changed
+        self.show = show
+        self.buffer: List[str] = []
+        self.live = False
+        self.cancelled = False
+        self.started_first = False
+        self.finished = False
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[BaseException] = None
+        self.started = time.perf_counter()
+        self.ttft: Optional[float] = None
+        self.aborts: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+        # daemon: a stalled loser must not keep the process alive
+        self.thread = threading.Thread(target=self._run, args=(run,), name=f"llt-hedge-{model}", daemon=True)
+        self.thread.start()
+
+    def on_text(self, text: str) -> None:
+        """Called for every delta; text is "" for tool call fragments, which count as a start too."""
+        if self.cancelled:
+            raise HedgeCancelled()
+        with self._lock:
+            if self.live:
+                self.show(text)
+            else:
+                self.buffer.append(text)
+        if not self.started_first:
+            self.ttft = time.perf_counter() - self.started
+            self._signal("started_first")
+
+    def _signal(self, name: str) -> None:
+        with self.changed:
+            setattr(self, name, True)
+            self.changed.notify_all()
+
+    def _run(self, run: Callable) -> None:
+        _current.attempt = self
+        try:
+            self.result = run(self.model, self.on_text)
+        except BaseException as e:
+            self.error = e
+        finally:
+            _current.attempt = None
+            self._signal("finished")
+
+    def cancel(self) -> None:
+        """Stop this attempt from the coordinating thread, aborting any open stream."""
+        with self._lock:
+            self.cancelled = True
+            aborts = list(self.aborts)
+        for abort in aborts:
+            abort()
+
+    @property
+    def succeeded(self) -> bool:
+        return self.finished and self.error is None and self.result is not None
+
+    def go_live(self) -> None:
+        """Show what has been buffered and stream the rest straight through."""
+        with self._lock:
+            self.show("".join(self.buffer))
+            self.buffer.clear()
+            self.live = True
+
+
+def run_hedged(
+    run: Callable[[str, Callable[[str], None]], Optional[Dict[str, Any]]],
+    primary: str,
+    backup: str,
+    deadline: float,
+    show: Callable[[str], None]
+) -> Attempt:
+    """
+    run(model, on_text) performs one completion. The backup is started when
+    the primary has shown no text by the deadline, or has already failed.
+    Returns the winning attempt, after its stream has finished; the loser's
+    stream is aborted at once (its socket shut down), or it is dropped before
+    sending if it was still waiting for a rate-limit slot.
+    """
+    changed = threading.Condition()
+    attempts = [Attempt(primary, run, changed, show)]
+    deadline_at = time.perf_counter() + deadline
+
+    def ready(attempt: Attempt) -> bool:
+        return attempt.started_first or attempt.succeeded
+
+    with changed:
+        while True:
+            winner = next((attempt for attempt in attempts if ready(attempt)), None)
+            if winner or all(attempt.finished for attempt in attempts) and len(attempts) == 2:
+                break
+            if len(attempts) == 1 and (time.perf_counter() >= deadline_at or attempts[0].finished):
+                attempts.append(Attempt(backup, run, changed, show))
+                continue
+            timeout = max(0.0, deadline_at - time.perf_counter()) if len(attempts) == 1 else None
+            changed.wait(timeout)
+
+    winner = winner or attempts[0]
+    for attempt in attempts:
+        if attempt is not winner:
+            attempt.cancel()
+    winner.go_live()
+    winner.thread.join()
+    record(primary, backup, fired=len(attempts) > 1, backup_won=winner.model == backup and winner.succeeded)
+    return winner
+
+
+@contextmanager
+def cancellable(abort: Callable[[], None]) -> Iterator[None]:
+    """
+    Within the block, a loss of the hedged attempt running on this thread
+    calls abort() from the coordinating thread. Outside a hedge it does nothing.
+    """
+    attempt = getattr(_current, "attempt", None)
+    if attempt is None:
+        yield
+        return
+    with attempt._lock:
+        attempt.aborts.append(abort)
+        cancelled = attempt.cancelled
+    if cancelled:
+        abort()
+    try:
+        yield
+    finally:
+        with attempt._lock:
+            attempt.aborts.remove(abort)
+
+
+def cancelled() -> bool:
+    """Whether the hedged attempt running on this thread has lost."""
+    attempt = getattr(_current, "attempt", None)
+    return attempt is not None and attempt.cancelled
+
+
+def stats_path() -> Optional[str]:
+    llt_path = os.getenv("LLT_PATH")
+    return os.path.join(llt_path, "hedging.json") if llt_path else None
+
+
+_stats_lock = threading.Lock()
+
+
+def load_stats() -> Dict[str, Dict[str, int]]:
+    try:
+        with open(stats_path()) as f:
+            return json.load(f)
+    except (OSError, TypeError, ValueError):
+        return {}
+
+
+def record(primary: str, backup: str, fired: bool, backup_won: bool) -> None:
+    """Count one hedged request under "primary -> backup"."""
+    if stats_path() is None:
+        return
+    with _stats_lock:
+        stats = load_stats()
+        entry = stats.setdefault(f"{primary} -> {backup}", {"requests": 0, "fired": 0, "backup_won": 0})
+        entry["requests"] += 1
+        entry["fired"] += int(fired)
+        entry["backup_won"] += int(backup_won)
+        tmp_path = f"{stats_path()}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(stats, f, indent=2)
+        os.replace(tmp_path, stats_path())
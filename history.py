@@ -0,0 +1,406 @@
+# history.py
+# Persistent (structurally shared) conversation container and undo/redo history.
+
+import sys
+import json
+import argparse
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, MutableSequence, Optional, Tuple
+
+from utils import Colors
+
+BITS = 5
+WIDTH = 1 << BITS
+MASK = WIDTH - 1
+
+
+class Message(Mapping):
+    """
+    Immutable, compact message record. Derive a changed copy with
+    Message(message, content=new_content) instead of editing in place.
+
+    The usual {"role", "content"} message is stored in two slots with the
+    role interned, instead of a per-message dict; messages with other keys
+    (or another key order) keep a private dict so they serialize unchanged.
+    Reads behave like a dict: msg["content"], msg.get("role"), dict(msg).
+    """
+    __slots__ = ("role", "content", "_extra")
+
+    def __init__(self, data: Any = (), **kwargs):
+        if kwargs or type(data) is not dict:
+            data = dict(data, **kwargs)
+        canonical = len(data) == 2 and next(iter(data)) == "role" and "content" in data
+        role = data.get("role")
+        _set_role(self, sys.intern(role) if type(role) is str else role)
+        _set_content(self, data.get("content"))
+        # non-canonical messages keep their own copy of every key, in order
+        _set_extra(self, None if canonical else dict(data))
+
+    def __getitem__(self, key: str) -> Any:
+        if self._extra is not None:
+            return self._extra[key]
+        if key == "content":
+            return self.content
+        if key == "role":
+            return self.role
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_CANONICAL_KEYS if self._extra is None else self._extra)
+
+    def __len__(self) -> int:
+        return 2 if self._extra is None else len(self._extra)
+
+    def __repr__(self) -> str:
+        return f"Message({dict(self)!r})"
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Message records are immutable; use Message(message, key=value) for a changed copy.")
+
+    __setitem__ = __delitem__ = __setattr__ = __delattr__ = _readonly
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self._extra) if self._extra is not None else {"role": self.role, "content": self.content}
+
+    def __copy__(self) -> "Message":
+        return self
+
+    def __deepcopy__(self, memo: Dict) -> "Message":
+        return self
+
+    def __reduce__(self):
+        return (Message, (self.to_dict(),))
+
+
+_CANONICAL_KEYS = ("role", "content")
+# slot setters: __setattr__ is disabled to keep records immutable
+_set_role = Message.role.__set__
+_set_content = Message.content.__set__
+_set_extra = Message._extra.__set__
+
+
+def json_default(obj: Any) -> Any:
+    """json.dump(s) default= hook that serializes Message records as plain dicts."""
+    if isinstance(obj, Message):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class LazyRecord:
+    """
+    Placeholder for a message stored in an indexed .ll file. The body is read
+    and parsed on first access; role and digest come from the index.
+    """
+    __slots__ = ("source", "offset", "length", "role", "content_length", "digest", "_message")
+
+    def __init__(self, source: Any, offset: int, length: int, role: str, content_length: int, digest: str):
+        self.source = source
+        self.offset = offset
+        self.length = length
+        self.role = sys.intern(role) if type(role) is str else role
+        self.content_length = content_length
+        self.digest = digest
+        self._message: Optional[Message] = None
+
+    def raw(self) -> bytes:
+        return self.source.read(self.offset, self.length)
+
+    def load(self) -> Message:
+        if self._message is None:
+            self._message = Message(json.loads(self.raw()))
+        return self._message
+
+
+def _resolve(item: Any) -> Any:
+    return item.load() if isinstance(item, LazyRecord) else item
+
+
+class PVector:
+    """
+    Persistent vector: a 32-way trie of tuples, as in Clojure.
+
+    Every update returns a new vector that shares all untouched nodes with
+    the old one, so keeping an old version around costs nothing.
+    get/set/append/pop-last are O(log32 n); inserting or deleting in the
+    middle rebuilds the vector in O(n), the same cost as list.insert/pop(i).
+    """
+    __slots__ = ("count", "shift", "root")
+
+    def __init__(self, count: int = 0, shift: int = BITS, root: Tuple = ()):
+        self.count = count
+        self.shift = shift
+        self.root = root
+
+    @classmethod
+    def from_iterable(cls, items: Iterable[Any]) -> "PVector":
+        items = list(items)
+        if not items:
+            return cls()
+        nodes = [tuple(items[i:i + WIDTH]) for i in range(0, len(items), WIDTH)]
+        shift = BITS
+        while len(nodes) > WIDTH:
+            nodes = [tuple(nodes[i:i + WIDTH]) for i in range(0, len(nodes), WIDTH)]
+            shift += BITS
+        return cls(len(items), shift, tuple(nodes))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _leaf(self, i: int) -> Tuple:
+        node = self.root
+        for level in range(self.shift, 0, -BITS):
+            node = node[(i >> level) & MASK]
+        return node
+
+    def get(self, i: int) -> Any:
+        return self._leaf(i)[i & MASK]
+
+    def set(self, i: int, value: Any) -> "PVector":
+        def assoc(node: Tuple, level: int) -> Tuple:
+            slot = (i >> level) & MASK
+            child = value if level == 0 else assoc(node[slot], level - BITS)
+            return node[:slot] + (child,) + node[slot + 1:]
+        return PVector(self.count, self.shift, assoc(self.root, self.shift))
+
+    def append(self, value: Any) -> "PVector":
+        def new_path(level: int) -> Tuple:
+            return (value,) if level == 0 else (new_path(level - BITS),)
+
+        def push(node: Tuple, level: int) -> Tuple:
+            slot = (self.count >> level) & MASK
+            if level == 0:
+                return node + (value,)
+            if slot < len(node):
+                return node[:slot] + (push(node[slot], level - BITS),)
+            return node + (new_path(level - BITS),)
+
+        if self.count and self.count == WIDTH << self.shift:
+            # root is full: grow the trie by one level
+            return PVector(self.count + 1, self.shift + BITS, (self.root, new_path(self.shift)))
+        return PVector(self.count + 1, self.shift, push(self.root, self.shift))
+
+    def pop(self) -> "PVector":
+        last = self.count - 1
+
+        def drop(node: Tuple, level: int) -> Tuple:
+            if level == 0:
+                return node[:-1]
+            slot = (last >> level) & MASK
+            child = drop(node[slot], level - BITS)
+            return node[:slot] + ((child,) if child else ())
+
+        root = drop(self.root, self.shift)
+        shift = self.shift
+        while shift > BITS and len(root) == 1:
+            root, shift = root[0], shift - BITS
+        return PVector(last, shift, root)
+
+    def common_prefix(self, other: "PVector") -> int:
+        """
+        Length of the shared prefix of two versions. Subtrees that are the same
+        object are skipped whole, so for an append this is O(log32 n).
+        """
+        def size(node: Tuple, level: int) -> int:
+            if level == 0:
+                return len(node)
+            return ((len(node) - 1) << level) + size(node[-1], level - BITS)
+
+        def prefix(x: Tuple, y: Tuple, level: int) -> Tuple[int, bool]:
+            matched = 0
+            for cx, cy in zip(x, y):
+                if cx is cy:
+                    matched += 1 if level == 0 else size(cx, level - BITS)
+                    continue
+                if level == 0:
+                    return matched, False
+                m, complete = prefix(cx, cy, level - BITS)
+                matched += m
+                if not complete:
+                    return matched, False
+            return matched, len(x) == len(y)
+
+        n = min(self.count, other.count)
+        if self.shift != other.shift:
+            matched = 0
+            for a, b in zip(self, other):
+                if a is not b:
+                    break
+                matched += 1
+            return matched
+        return min(prefix(self.root, other.root, self.shift)[0], n)
+
+    def __iter__(self) -> Iterator[Any]:
+        def walk(node: Tuple, level: int) -> Iterator[Any]:
+            if level == 0:
+                yield from node
+            else:
+                for child in node:
+                    yield from walk(child, level - BITS)
+        return walk(self.root, self.shift)
+
+
+def _freeze(message: Any) -> Any:
+    return message if isinstance(message, Message) or not isinstance(message, dict) else Message(message)
+
+
+def splice_kind(before_len: int, at: int, removed: int, added: List[Any]) -> str:
+    """Name a splice as one of none/append/remove/replace/splice."""
+    if not removed and not added:
+        return "none"
+    if not removed and at == before_len:
+        return "append"
+    if not added:
+        return "remove"
+    if removed == len(added):
+        return "replace"
+    return "splice"
+
+
+class Conversation(MutableSequence):
+    """
+    List-like conversation backed by a PVector of immutable Message records.
+
+    Plain dicts are frozen into Message records on the way in, so a snapshot
+    taken with snapshot()/copy() is O(1) and can never be changed by later
+    edits. Plugins replace records (messages[i] = Message(messages[i], content=...))
+    instead of mutating them. Items may be LazyRecords; they are resolved only
+    when read, and structural edits (slicing, removal, insertion) never read them.
+    """
+
+    def __init__(self, messages: Iterable[Any] = ()):
+        if isinstance(messages, Conversation):
+            self._vec = messages._vec
+        elif isinstance(messages, PVector):
+            self._vec = messages
+        else:
+            self._vec = PVector.from_iterable(_freeze(m) for m in messages)
+
+    def _index(self, i: int) -> int:
+        n = self._vec.count
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("conversation index out of range")
+        return i
+
+    def __len__(self) -> int:
+        return self._vec.count
+
+    def __iter__(self) -> Iterator[Message]:
+        return map(_resolve, self._vec)
+
+    def raw_items(self) -> List[Any]:
+        """Stored items without resolving LazyRecords."""
+        return list(self._vec)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return Conversation(PVector.from_iterable(self.raw_items()[i]))
+        return _resolve(self._vec.get(self._index(i)))
+
+    def __setitem__(self, i, value) -> None:
+        if isinstance(i, slice):
+            items = self.raw_items()
+            items[i] = [_freeze(m) for m in value]
+            self._vec = PVector.from_iterable(items)
+        else:
+            self._vec = self._vec.set(self._index(i), _freeze(value))
+
+    def __delitem__(self, i) -> None:
+        if not isinstance(i, slice) and self._index(i) == self._vec.count - 1:
+            self._vec = self._vec.pop()
+            return
+        items = self.raw_items()
+        del items[i if isinstance(i, slice) else self._index(i)]
+        self._vec = PVector.from_iterable(items)
+
+    def insert(self, i: int, value: Any) -> None:
+        if i >= self._vec.count:
+            self.append(value)
+            return
+        items = self.raw_items()
+        items.insert(i, _freeze(value))
+        self._vec = PVector.from_iterable(items)
+
+    def append(self, value: Any) -> None:
+        self._vec = self._vec.append(_freeze(value))
+
+    def extend(self, values: Iterable[Any]) -> None:
+        items = values.raw_items() if isinstance(values, Conversation) else values
+        for value in items:
+            self._vec = self._vec.append(_freeze(value))
+
+    def pop(self, i: int = -1) -> Message:
+        value = self[i]
+        del self[i]
+        return value
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Conversation) and other._vec is self._vec:
+            return True
+        if isinstance(other, (Conversation, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Conversation({list(self)!r})"
+
+    def snapshot(self) -> "Conversation":
+        """O(1) immutable-by-construction copy sharing structure with self."""
+        return Conversation(self._vec)
+
+    copy = snapshot
+
+    def diff(self, other: "Conversation", resolve: bool = True) -> Tuple[int, int, List[Message]]:
+        """
+        Describe other as a single splice of self: (at, removed, added) means
+        other == self[:at] + added + self[at + removed:]. Records are compared
+        by identity, which is exact because they are immutable. With
+        resolve=False, added holds stored items (LazyRecords stay unloaded).
+        """
+        at = self._vec.common_prefix(other._vec)
+        tail = 0
+        limit = min(len(self), len(other)) - at
+        while tail < limit and self._vec.get(len(self) - 1 - tail) is other._vec.get(len(other) - 1 - tail):
+            tail += 1
+        added = [other._vec.get(i) for i in range(at, len(other) - tail)]
+        return at, len(self) - at - tail, [_resolve(item) for item in added] if resolve else added
+
+    def to_list(self) -> List[Message]:
+        """Plain list for serialization and provider payloads."""
+        return list(self)
+
+
+class History:
+    """Linear undo/redo over conversation snapshots."""
+
+    def __init__(self, max_versions: int = 100):
+        self.max_versions = max_versions
+        self.undo_stack: List[Conversation] = []
+        self.redo_stack: List[Conversation] = []
+
+    def record(self, before: Conversation, after: Conversation) -> None:
+        """Remember the state before a command that changed the conversation."""
+        if before._vec is after._vec:
+            return
+        self.undo_stack.append(before)
+        del self.undo_stack[:-self.max_versions]
+        self.redo_stack.clear()
+
+    def undo(self, messages: Conversation, args: argparse.Namespace, index: int = -1) -> Conversation:
+        if not self.undo_stack:
+            Colors.print_colored("Nothing to undo.", Colors.YELLOW)
+            return messages
+        self.redo_stack.append(messages.snapshot())
+        restored = self.undo_stack.pop()
+        Colors.print_colored(f"Undone; conversation has {len(restored)} messages.", Colors.GREEN)
+        return restored.snapshot()
+
+    def redo(self, messages: Conversation, args: argparse.Namespace, index: int = -1) -> Conversation:
+        if not self.redo_stack:
+            Colors.print_colored("Nothing to redo.", Colors.YELLOW)
+            return messages
+        self.undo_stack.append(messages.snapshot())
+        restored = self.redo_stack.pop()
+        Colors.print_colored(f"Redone; conversation has {len(restored)} messages.", Colors.GREEN)
+        return restored.snapshot()
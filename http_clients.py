@@ -0,0 +1,125 @@
+# http_clients.py
+# Shared keep-alive HTTP sessions and provider clients.
+#
+# Every completion used to open a fresh TCP+TLS connection (bare requests.post,
+# a new anthropic.Client per call). Sessions here are created once per
+# (provider, host) and reused by later commands and background jobs, so only
+# the first request to a host pays for the handshake.
+
+import socket
+import threading
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_SETTINGS = {
+    "pool_connections": 4,  # hosts kept per session
+    "pool_maxsize": 8,  # connections kept per host; >= --max_jobs avoids churn
+    "connect_timeout": 10.0,
+    "read_timeout": 300.0,  # between streamed chunks, not for the whole reply
+    "fetch_timeout": 10.0,  # read timeout of plain page fetches (url_fetch)
+    "max_retries": 2,  # provider SDK clients only
+}
+
+_settings: Dict[str, Dict[str, Any]] = {}
+_sessions: Dict[Tuple[str, str], requests.Session] = {}
+_clients: Dict[Tuple[str, Optional[str]], Any] = {}
+_lock = threading.Lock()
+
+
+def configure(config: Dict[str, Any]) -> None:
+    """
+    Read pool sizes and timeouts from config.yaml: a top-level http section,
+    overridden per provider by an http section inside the provider.
+
+        http:
+          pool_maxsize: 16
+          read_timeout: 600
+        providers:
+          local:
+            http: {connect_timeout: 1}
+    """
+    defaults = {**DEFAULT_SETTINGS, **(config.get("http") or {})}
+    with _lock:
+        _settings.clear()
+        _settings["*"] = defaults
+        for provider, details in (config.get("providers") or {}).items():
+            _settings[provider] = {**defaults, **(details.get("http") or {})}
+
+
+def settings(provider: str = "*") -> Dict[str, Any]:
+    return _settings.get(provider) or _settings.get("*") or DEFAULT_SETTINGS
+
+
+def timeout(provider: str = "*", read: str = "read_timeout") -> Tuple[float, float]:
+    """(connect, read) timeout for requests calls; read names the read timeout setting."""
+    current = settings(provider)
+    return (float(current["connect_timeout"]), float(current[read]))
+
+
+def session(url: str, provider: str = "*") -> requests.Session:
+    """Pooled keep-alive session for provider and the host of url."""
+    key = (provider, urlparse(url).netloc)
+    with _lock:
+        current = _sessions.get(key)
+        if current is None:
+            current = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=int(settings(provider)["pool_connections"]),
+                pool_maxsize=int(settings(provider)["pool_maxsize"]),
+            )
+            current.mount("https://", adapter)
+            current.mount("http://", adapter)
+            _sessions[key] = current
+        return current
+
+
+def anthropic_client(api_key: Optional[str] = None, provider: str = "anthropic"):
+    """Cached anthropic.Client; it keeps its own connection pool across calls."""
+    key = (provider, api_key)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            import anthropic
+            import httpx
+
+            current = settings(provider)
+            client = anthropic.Client(
+                api_key=api_key,
+                max_retries=int(current["max_retries"]),
+                timeout=httpx.Timeout(float(current["read_timeout"]), connect=float(current["connect_timeout"])),
+                http_client=httpx.Client(limits=httpx.Limits(
+                    max_connections=int(current["pool_maxsize"]),
+                    max_keepalive_connections=int(current["pool_maxsize"]),
+                )),
+            )
+            _clients[key] = client
+        return client
+
+
+
+def abort(response: Any) -> None:
+    """
+    Stop a streamed response from another thread. Closing is not enough, as a
+    read blocked on a stalled server only returns at the read timeout; shutting
+    the socket down makes it fail at once. Takes requests and httpx responses.
+
+    The socket is found through private internals (urllib3's raw._connection,
+    httpcore's network_stream extension) that may change between versions;
+    without it the response is only closed.
+    """
+    raw = getattr(response, "raw", None)
+    if raw is not None:
+        sock = getattr(getattr(raw, "_connection", None), "sock", None)
+    else:
+        network_stream = (getattr(response, "extensions", None) or {}).get("network_stream")
+        sock = network_stream.get_extra_info("socket") if network_stream is not None else None
+    if sock is None:
+        response.close()
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass  # already closed
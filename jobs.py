@@ -0,0 +1,200 @@
+# jobs.py
+# Background jobs for the interactive shell.
+
+import sys
+import copy
+import argparse
+import threading
+import traceback
+from io import StringIO, TextIOBase
+from concurrent.futures import ThreadPoolExecutor, Future
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from utils import Colors, list_input
+from history import Conversation, History
+
+
+class _ThreadRoutedStdout(TextIOBase):
+    """
+    Send writes from job threads to their own buffer, everything else to the
+    terminal. fileno() and isatty() are the terminal's, so input() keeps using
+    readline and tty checks (paging, status lines) behave as before.
+    """
+
+    def __init__(self, terminal):
+        self.terminal = terminal
+        self.buffers: Dict[int, StringIO] = {}
+
+    def writable(self) -> bool:
+        return True
+
+    def fileno(self) -> int:
+        return self.terminal.fileno()
+
+    def isatty(self) -> bool:
+        # job threads write to a buffer, never to the terminal
+        return threading.get_ident() not in self.buffers and self.terminal.isatty()
+
+    @property
+    def encoding(self) -> str:
+        return self.terminal.encoding
+
+    @property
+    def errors(self) -> Optional[str]:
+        return self.terminal.errors
+
+    def write(self, text: str) -> int:
+        buffer = self.buffers.get(threading.get_ident())
+        return (buffer or self.terminal).write(text)
+
+    def flush(self) -> None:
+        if threading.get_ident() not in self.buffers:
+            self.terminal.flush()
+
+
+@dataclass
+class Job:
+    id: int
+    cmd_name: str
+    index: int
+    snapshot: Conversation  # conversation as it was when the job started
+    future: Optional[Future] = None
+    output: StringIO = field(default_factory=StringIO)
+    cancelled: bool = False
+    merged: bool = False
+
+    @property
+    def status(self) -> str:
+        if self.cancelled:
+            return "cancelled"
+        if self.merged:
+            return "merged"
+        if not self.future.done():
+            return "running" if self.future.running() else "queued"
+        return "failed" if self.future.exception() else "done"
+
+
+class JobManager:
+    """
+    Run commands on a thread pool against a snapshot of the conversation.
+
+    Commands run non-interactively on a copy of args. When a job finishes its
+    new trailing messages are merged into the live conversation by the main
+    loop, so the message list is only ever touched from one thread.
+    """
+
+    def __init__(self, cmd_map: Dict[str, Callable], max_workers: int = 2):
+        self.cmd_map = cmd_map
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llt-job")
+        self.jobs: Dict[int, Job] = {}
+        self.next_id = 1
+        self.stdout: Optional[_ThreadRoutedStdout] = None
+
+    def _job_args(self, args: argparse.Namespace, cmd_name: str) -> argparse.Namespace:
+        from plugins import _plugins_registry
+
+        job_args = copy.copy(args)
+        job_args.non_interactive = True
+        # bool flags mark the command as invoked with an explicit index, as on the CLI
+        info = _plugins_registry.get(getattr(self.cmd_map[cmd_name], "__name__", ""), {})
+        if info.get("type") in ("bool", "boolean"):
+            setattr(job_args, info["flag"], True)
+        return job_args
+
+    def _run(self, job: Job, args: argparse.Namespace) -> List[Dict]:
+        self.stdout.buffers[threading.get_ident()] = job.output
+        try:
+            return self.cmd_map[job.cmd_name](job.snapshot.snapshot(), args, job.index)
+        except Exception:
+            job.output.write(traceback.format_exc())
+            raise
+        finally:
+            del self.stdout.buffers[threading.get_ident()]
+
+    def submit(self, cmd_name: str, messages: List[Dict], args: argparse.Namespace, index: int) -> int:
+        if self.stdout is None:
+            self.stdout = _ThreadRoutedStdout(sys.stdout)
+            sys.stdout = self.stdout
+
+        job = Job(self.next_id, cmd_name, index, Conversation(messages).snapshot())
+        self.next_id += 1
+        job.future = self.executor.submit(self._run, job, self._job_args(args, cmd_name))
+        self.jobs[job.id] = job
+        Colors.print_colored(f"Started job {job.id}: {cmd_name} (index: {index})", Colors.GREEN)
+        return job.id
+
+    def _merge(self, job: Job, messages: Conversation, history: Optional[History] = None) -> Conversation:
+        job.merged = True
+        if job.future.exception():
+            Colors.print_colored(f"Job {job.id} ({job.cmd_name}) failed: {job.future.exception()}", Colors.RED)
+            return messages
+
+        result = Conversation(job.future.result())
+        base = len(job.snapshot)
+        # identity diff: untouched records are the same objects, so nothing is loaded or compared
+        if job.snapshot.diff(result)[0] < base:
+            Colors.print_colored(
+                f"Job {job.id} ({job.cmd_name}) changed existing messages; only new messages are merged.",
+                Colors.YELLOW
+            )
+        appended = result[base:] if len(result) >= base else []
+        messages_before = messages.snapshot()
+        messages.extend(appended)
+        if history:
+            history.record(messages_before, messages.snapshot())
+        Colors.print_colored(f"Job {job.id} ({job.cmd_name}) merged {len(appended)} message(s).", Colors.GREEN)
+        return messages
+
+    def collect(self, messages: Conversation, history: Optional[History] = None) -> Conversation:
+        """Merge every finished job into messages. Called from the main loop only."""
+        for job in self.jobs.values():
+            if not job.merged and not job.cancelled and job.future.done():
+                messages = self._merge(job, messages, history)
+        return messages
+
+    def _select(self, index: int, states: List[str]) -> Optional[Job]:
+        if index in self.jobs:
+            return self.jobs[index]
+        candidates = [str(job.id) for job in self.jobs.values() if job.status in states]
+        if not candidates:
+            Colors.print_colored("No matching jobs.", Colors.YELLOW)
+            return None
+        if len(candidates) == 1:
+            return self.jobs[int(candidates[0])]
+        selected = list_input(candidates, "Select job id")
+        return self.jobs.get(int(selected)) if selected.isdigit() else None
+
+    def list_jobs(self, messages: List[Dict], args: argparse.Namespace, index: int = -1) -> List[Dict]:
+        if not self.jobs:
+            Colors.print_colored("No background jobs.", Colors.YELLOW)
+        for job in self.jobs.values():
+            lines = job.output.getvalue().strip().splitlines()
+            last = f" | {lines[-1][:60]}" if lines else ""
+            print(f"[{job.id}] {job.status:9} {job.cmd_name} (index: {job.index}){last}")
+        return messages
+
+    def wait(self, messages: List[Dict], args: argparse.Namespace, index: int = -1) -> List[Dict]:
+        job = self._select(index, ["queued", "running", "done", "failed"])
+        if not job or job.cancelled:
+            return messages
+        Colors.print_colored(f"Waiting for job {job.id} ({job.cmd_name})...", Colors.YELLOW)
+        try:
+            job.future.exception()  # blocks until finished
+        except KeyboardInterrupt:
+            Colors.print_colored(f"Stopped waiting; job {job.id} is still running.", Colors.YELLOW)
+            return messages
+        print(job.output.getvalue())
+        return messages if job.merged else self._merge(job, messages)
+
+    def cancel(self, messages: List[Dict], args: argparse.Namespace, index: int = -1) -> List[Dict]:
+        job = self._select(index, ["queued", "running"])
+        if not job:
+            return messages
+        job.cancelled = True
+        if job.future.cancel():
+            Colors.print_colored(f"Cancelled job {job.id} before it started.", Colors.GREEN)
+        else:
+            # threads cannot be interrupted; the result is simply discarded
+            Colors.print_colored(f"Job {job.id} will finish in the background; its result will be discarded.", Colors.YELLOW)
+        return messages
@@ -0,0 +1,131 @@
+# journal.py
+# .ll storage: classic JSON arrays and append-only journals.
+#
+# A journal is JSONL: a header line, then one splice per save
+#   {"llt_journal": 1}
+#   {"op": "append", "at": 4, "removed": 0, "added": [...]}
+#   {"op": "snapshot", "messages": [...]}      (written by compaction)
+# Replaying the lines in order rebuilds the conversation.
+
+import os
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+import ll_index
+import ll_codecs
+from history import Conversation, json_default, splice_kind
+
+JOURNAL_HEADER = {"llt_journal": 1}
+
+# path -> (conversation as last read/written, file size, mtime_ns)
+_synced: Dict[str, Tuple[Conversation, int, int]] = {}
+
+
+def is_journal(path: str) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.read(16).lstrip().startswith(b'{"llt_journal"')
+    except FileNotFoundError:
+        return False
+
+
+def _mark_synced(path: str, messages: Conversation) -> None:
+    stat = os.stat(path)
+    _synced[os.path.abspath(path)] = (messages.snapshot(), stat.st_size, stat.st_mtime_ns)
+
+
+def _synced_state(path: str) -> Optional[Conversation]:
+    """Conversation last synced with path, if the file has not changed since."""
+    state = _synced.get(os.path.abspath(path))
+    if not state or not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    messages, size, mtime_ns = state
+    return messages if (stat.st_size, stat.st_mtime_ns) == (size, mtime_ns) else None
+
+
+def replay(lines: List[str]) -> List[Any]:
+    messages: List[Any] = []
+    for number, line in enumerate(lines):
+        if not line.strip() or number == 0:
+            continue
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            if number == len(lines) - 1:
+                break  # torn final write; everything before it is intact
+            raise
+        if entry["op"] == "snapshot":
+            messages = entry["messages"]
+        else:
+            at, removed = entry["at"], entry["removed"]
+            messages[at:at + removed] = entry["added"]
+    return messages
+
+
+def read_messages(path: str) -> Conversation:
+    """Load a .ll file in any format: classic, journal or a codec from ll_codecs."""
+    codec = ll_codecs.codec_for_path(path)
+    if codec:
+        return Conversation(ll_codecs.read(path, codec))
+    if is_journal(path):
+        with open(path, "r") as f:
+            messages = Conversation(replay(f.read().splitlines()))
+        _mark_synced(path, messages)
+        return messages
+    try:
+        return ll_index.open_indexed(path)
+    except ValueError:
+        with open(path, "r") as f:
+            return Conversation(json.load(f))
+
+
+def _dump_line(entry: Dict) -> str:
+    return json.dumps(entry, separators=(",", ":"), default=json_default) + "\n"
+
+
+def _write_snapshot(path: str, messages: Conversation) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(_dump_line(JOURNAL_HEADER))
+        f.write(_dump_line({"op": "snapshot", "messages": messages.to_list()}))
+    os.replace(tmp_path, path)
+
+
+def write_messages(path: str, messages: Any, journal: bool = False) -> str:
+    """
+    Save messages to path. Existing journals (or journal=True) are extended
+    with a single splice against the last synced state; otherwise the file is
+    rewritten as a classic JSON array. Paths with a codec extension are
+    rewritten with that codec. Returns the op that was written.
+    """
+    messages = Conversation(messages)
+    codec = ll_codecs.codec_for_path(path)
+    if codec:
+        ll_codecs.write(path, messages, codec)
+        return codec.name
+    if not (journal or is_journal(path)):
+        ll_index.write_indexed(path, messages)
+        return "json"
+
+    synced = _synced_state(path)
+    if synced is None:
+        _write_snapshot(path, messages)
+        op = "snapshot"
+    else:
+        at, removed, added = synced.diff(messages)
+        op = splice_kind(len(synced), at, removed, added)
+        if op != "none":
+            with open(path, "a") as f:
+                f.write(_dump_line({"op": op, "at": at, "removed": removed, "added": added}))
+    _mark_synced(path, messages)
+    return op
+
+
+def compact(path: str) -> Tuple[int, int]:
+    """Fold a journal into a single snapshot. Returns (bytes before, bytes after)."""
+    before = os.path.getsize(path)
+    messages = read_messages(path)
+    _write_snapshot(path, messages)
+    _mark_synced(path, messages)
+    return before, os.path.getsize(path)
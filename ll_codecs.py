@@ -0,0 +1,322 @@
+# ll_codecs.py
+# Conversation codecs selected by file extension (or the --codec flag).
+#
+#   .ll           pretty-printed JSON array or journal (handled by journal.py)
+#   .ll.gz        gzip-compressed JSON lines, one message per line
+#   .ll.zst       zstd-compressed JSON lines (needs the zstandard package)
+#   .ll.msgpack   MessagePack stream: a {"llt_pack": 1} header, then one message per object
+#
+# Every codec streams: encode writes one message at a time and decode yields
+# messages as they are read, so neither holds a second copy of the file.
+
+import io
+import os
+import gzip
+import json
+import struct
+from abc import ABC, abstractmethod
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from history import json_default
+
+try:
+    import zstandard  # type: ignore
+except ImportError:
+    zstandard = None
+
+try:
+    import msgpack  # type: ignore
+except ImportError:
+    msgpack = None
+
+CHUNK_SIZE = 1 << 16
+
+
+class Codec(ABC):
+    name = ""
+    extension = ""
+    magic = b""
+
+    @abstractmethod
+    def encode(self, messages: Iterable[Dict], f) -> None:
+        ...
+
+    @abstractmethod
+    def decode(self, f) -> Iterator[Dict]:
+        ...
+
+
+class JsonLinesCodec(Codec):
+    """Compact JSON lines inside a compressed stream."""
+
+    @abstractmethod
+    def open_write(self, f):
+        ...
+
+    @abstractmethod
+    def open_read(self, f):
+        ...
+
+    def encode(self, messages: Iterable[Dict], f) -> None:
+        with self.open_write(f) as stream:
+            text = io.TextIOWrapper(stream, encoding="utf-8")
+            for message in messages:
+                text.write(json.dumps(message, separators=(",", ":"), default=json_default))
+                text.write("\n")
+            text.flush()
+            text.detach()
+
+    def decode(self, f) -> Iterator[Dict]:
+        with self.open_read(f) as stream:
+            for line in io.TextIOWrapper(stream, encoding="utf-8"):
+                if line.strip():
+                    yield json.loads(line)
+
+
+class GzipCodec(JsonLinesCodec):
+    name = "gzip"
+    extension = ".ll.gz"
+    magic = b"\x1f\x8b"
+
+    def open_write(self, f):
+        return gzip.GzipFile(fileobj=f, mode="wb", compresslevel=6, mtime=0)
+
+    def open_read(self, f):
+        return gzip.GzipFile(fileobj=f, mode="rb")
+
+
+class ZstdCodec(JsonLinesCodec):
+    name = "zstd"
+    extension = ".ll.zst"
+    magic = b"\x28\xb5\x2f\xfd"
+
+    @staticmethod
+    def _require() -> None:
+        if zstandard is None:
+            raise ImportError("The zstandard package is required for .ll.zst files (pip install zstandard).")
+
+    def open_write(self, f):
+        self._require()
+        return zstandard.ZstdCompressor(level=3).stream_writer(f, closefd=False)
+
+    def open_read(self, f):
+        self._require()
+        return zstandard.ZstdDecompressor().stream_reader(f, closefd=False)
+
+
+class _Incomplete(Exception):
+    """The buffer ends in the middle of an object."""
+
+
+def pack(obj: Any, out: bytearray) -> None:
+    """Append the MessagePack encoding of a JSON-like value to out."""
+    if obj is None:
+        out.append(0xC0)
+    elif obj is True:
+        out.append(0xC3)
+    elif obj is False:
+        out.append(0xC2)
+    elif isinstance(obj, int):
+        if 0 <= obj < 0x80:
+            out.append(obj)
+        elif -32 <= obj < 0:
+            out.append(obj & 0xFF)
+        elif obj >= 0:
+            out += struct.pack(">BQ", 0xCF, obj)
+        else:
+            out += struct.pack(">Bq", 0xD3, obj)
+    elif isinstance(obj, float):
+        out += struct.pack(">Bd", 0xCB, obj)
+    elif isinstance(obj, str):
+        data = obj.encode("utf-8")
+        n = len(data)
+        if n < 32:
+            out.append(0xA0 | n)
+        elif n < 0x100:
+            out += struct.pack(">BB", 0xD9, n)
+        elif n < 0x10000:
+            out += struct.pack(">BH", 0xDA, n)
+        else:
+            out += struct.pack(">BI", 0xDB, n)
+        out += data
+    elif isinstance(obj, (bytes, bytearray)):
+        n = len(obj)
+        out += struct.pack(">BI", 0xC6, n) if n >= 0x10000 else struct.pack(">BH", 0xC5, n)
+        out += obj
+    elif isinstance(obj, (list, tuple)):
+        n = len(obj)
+        if n < 16:
+            out.append(0x90 | n)
+        else:
+            out += struct.pack(">BI", 0xDD, n)
+        for item in obj:
+            pack(item, out)
+    elif isinstance(obj, Mapping):
+        n = len(obj)
+        if n < 16:
+            out.append(0x80 | n)
+        else:
+            out += struct.pack(">BI", 0xDF, n)
+        for key, value in obj.items():
+            pack(key, out)
+            pack(value, out)
+    else:
+        raise TypeError(f"Cannot pack {type(obj).__name__}")
+
+
+_FIXED = {
+    0xCC: ">B", 0xCD: ">H", 0xCE: ">I", 0xCF: ">Q",
+    0xD0: ">b", 0xD1: ">h", 0xD2: ">i", 0xD3: ">q",
+    0xCA: ">f", 0xCB: ">d",
+}
+_LENGTH = {0xD9: ">B", 0xDA: ">H", 0xDB: ">I", 0xC4: ">B", 0xC5: ">H", 0xC6: ">I"}
+
+
+def unpack(buf: bytes, pos: int = 0):
+    """Decode one object at pos; returns (obj, next_pos) or raises _Incomplete."""
+    if pos >= len(buf):
+        raise _Incomplete
+    b = buf[pos]
+    pos += 1
+    if b < 0x80:
+        return b, pos
+    if b >= 0xE0:
+        return b - 0x100, pos
+    if 0xA0 <= b < 0xC0 or b in _LENGTH:
+        if b < 0xC0:
+            n = b & 0x1F
+        else:
+            size = struct.calcsize(_LENGTH[b])
+            if pos + size > len(buf):
+                raise _Incomplete
+            n = struct.unpack_from(_LENGTH[b], buf, pos)[0]
+            pos += size
+        if pos + n > len(buf):
+            raise _Incomplete
+        data = buf[pos:pos + n]
+        return (bytes(data) if b in (0xC4, 0xC5, 0xC6) else data.decode("utf-8")), pos + n
+    if b < 0xA0 or b in (0xDC, 0xDD, 0xDE, 0xDF):
+        if b < 0xA0:
+            n, is_map = b & 0x0F, b < 0x90
+        else:
+            fmt = ">H" if b in (0xDC, 0xDE) else ">I"
+            size = struct.calcsize(fmt)
+            if pos + size > len(buf):
+                raise _Incomplete
+            n, is_map = struct.unpack_from(fmt, buf, pos)[0], b in (0xDE, 0xDF)
+            pos += size
+        if is_map:
+            result = {}
+            for _ in range(n):
+                key, pos = unpack(buf, pos)
+                result[key], pos = unpack(buf, pos)
+            return result, pos
+        items = []
+        for _ in range(n):
+            item, pos = unpack(buf, pos)
+            items.append(item)
+        return items, pos
+    if b in (0xC0, 0xC2, 0xC3):
+        return {0xC0: None, 0xC2: False, 0xC3: True}[b], pos
+    if b in _FIXED:
+        size = struct.calcsize(_FIXED[b])
+        if pos + size > len(buf):
+            raise _Incomplete
+        return struct.unpack_from(_FIXED[b], buf, pos)[0], pos + size
+    raise ValueError(f"Unsupported MessagePack type byte 0x{b:02x}")
+
+
+class MsgpackCodec(Codec):
+    """
+    MessagePack stream. Uses the msgpack package when it is installed and a
+    small built-in encoder/decoder (same wire format) otherwise.
+    """
+    name = "msgpack"
+    extension = ".ll.msgpack"
+    header = {"llt_pack": 1}
+    magic = b"\x81\xa8llt_pack"
+
+    def encode(self, messages: Iterable[Dict], f) -> None:
+        if msgpack is not None:
+            packer = msgpack.Packer(use_bin_type=True, default=json_default)
+            f.write(packer.pack(self.header))
+            for message in messages:
+                f.write(packer.pack(message))
+            return
+        out = bytearray()
+        pack(self.header, out)
+        for message in messages:
+            pack(message, out)
+            if len(out) >= CHUNK_SIZE:
+                f.write(out)
+                out.clear()
+        f.write(out)
+
+    def _objects(self, f) -> Iterator[Any]:
+        if msgpack is not None:
+            yield from msgpack.Unpacker(f, raw=False)
+            return
+        buf, pos = bytearray(), 0
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            # drop what was decoded and append in place, not copy the rest per chunk
+            del buf[:pos]
+            buf += chunk
+            pos = 0
+            while True:
+                try:
+                    obj, end = unpack(buf, pos)
+                except _Incomplete:
+                    break
+                pos = end
+                yield obj
+            if not chunk:
+                if pos < len(buf):
+                    raise ValueError("Truncated MessagePack stream")
+                return
+
+    def decode(self, f) -> Iterator[Dict]:
+        objects = self._objects(f)
+        if next(objects, None) != self.header:
+            raise ValueError("Not an llt MessagePack conversation")
+        yield from objects
+
+
+CODECS: Dict[str, Codec] = {codec.name: codec for codec in (GzipCodec(), ZstdCodec(), MsgpackCodec())}
+
+
+def codec_for_path(path: str) -> Optional[Codec]:
+    """Codec for path by extension, then by magic bytes; None for native .ll files."""
+    for codec in CODECS.values():
+        if path.endswith(codec.extension):
+            return codec
+    try:
+        with open(path, "rb") as f:
+            head = f.read(16)
+    except FileNotFoundError:
+        return None
+    return next((codec for codec in CODECS.values() if head.startswith(codec.magic)), None)
+
+
+def with_extension(path: str, codec_name: Optional[str]) -> str:
+    """Path with its conversation extension replaced by the named codec's."""
+    if not codec_name:
+        return path
+    extension = CODECS[codec_name].extension if codec_name != "json" else ".ll"
+    for known in [c.extension for c in CODECS.values()] + [".ll"]:
+        if path.endswith(known):
+            return path[:-len(known)] + extension
+    return path + extension
+
+
+def read(path: str, codec: Codec) -> Iterator[Dict]:
+    with open(path, "rb") as f:
+        yield from codec.decode(f)
+
+
+def write(path: str, messages: Iterable[Dict], codec: Codec) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        codec.encode(messages, f)
+    os.replace(tmp_path, path)
@@ -0,0 +1,160 @@
+# ll_index.py
+# Offset index sidecars for classic (JSON array) .ll files.
+#
+# For each message the sidecar .<name>.idx stores its byte offset and length
+# in the .ll file, its role, content length and a content hash. Opening an
+# indexed file reads only the sidecar; message bodies are parsed on access.
+
+import os
+import re
+import json
+import hashlib
+import threading
+from typing import Any, List, Optional
+
+from history import Conversation, LazyRecord, json_default
+
+SIDECAR_VERSION = 1
+
+_SEPARATORS = re.compile(r"[\s,]*")
+_decoder = json.JSONDecoder()
+
+
+def sidecar_path(path: str) -> str:
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.idx")
+
+
+def content_length(message: Any) -> int:
+    content = message.get("content")
+    if isinstance(content, str):
+        return len(content)
+    if isinstance(content, list):
+        return sum(len(part.get("text", "")) for part in content if isinstance(part, dict))
+    return 0
+
+
+def digest(body: bytes) -> str:
+    return hashlib.sha1(body).hexdigest()[:16]
+
+
+class IndexedSource:
+    """
+    Open read handle on an indexed .ll file. Holding the handle keeps lazy
+    records valid even after write replaces the file on disk.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "rb")
+        self.lock = threading.Lock()
+
+    def read(self, offset: int, length: int) -> bytes:
+        with self.lock:
+            self.file.seek(offset)
+            return self.file.read(length)
+
+    def __del__(self):
+        file = getattr(self, "file", None)  # unset when open() failed
+        if file is not None:
+            file.close()
+
+
+def build_index(path: str) -> List[list]:
+    """
+    Scan an .ll file once and return its index entries. String offsets are
+    byte offsets in an ASCII file; otherwise they are converted by encoding
+    the text between consecutive offsets, so the file is still parsed once.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    text = data.decode("utf-8")
+    ascii_only = data.isascii()
+    converted = [0, 0]  # last string offset converted and its byte offset
+
+    def byte_offset(offset: int) -> int:
+        if ascii_only:
+            return offset
+        converted[1] += len(text[converted[0]:offset].encode("utf-8"))
+        converted[0] = offset
+        return converted[1]
+
+    i = _SEPARATORS.match(text).end()
+    if not text.startswith("[", i):
+        raise ValueError(f"{path} is not a JSON array")
+    entries = []
+    i += 1
+    while True:
+        i = _SEPARATORS.match(text, i).end()
+        if text.startswith("]", i):
+            return entries
+        message, end = _decoder.raw_decode(text, i)
+        if not isinstance(message, dict):
+            raise ValueError(f"{path} is not an array of messages")
+        start, stop = byte_offset(i), byte_offset(end)
+        body = data[start:stop]
+        entries.append([start, stop - start, message.get("role"), content_length(message), digest(body)])
+        i = end
+
+
+def _save_sidecar(path: str, entries: List[list]) -> None:
+    stat = os.stat(path)
+    sidecar = {"version": SIDECAR_VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "entries": entries}
+    try:
+        with open(sidecar_path(path), "w") as f:
+            json.dump(sidecar, f, separators=(",", ":"))
+    except OSError:
+        pass  # read-only directory: the index is rebuilt next time
+
+
+def _load_sidecar(path: str) -> Optional[List[list]]:
+    try:
+        with open(sidecar_path(path), "r") as f:
+            sidecar = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    stat = os.stat(path)
+    if (sidecar.get("version"), sidecar.get("size"), sidecar.get("mtime_ns")) != (SIDECAR_VERSION, stat.st_size, stat.st_mtime_ns):
+        return None
+    return sidecar["entries"]
+
+
+def open_indexed(path: str) -> Conversation:
+    """Open a classic .ll file as a conversation of lazily loaded messages."""
+    entries = _load_sidecar(path)
+    if entries is None:
+        entries = build_index(path)
+        _save_sidecar(path, entries)
+    source = IndexedSource(path)
+    return Conversation([LazyRecord(source, *entry) for entry in entries])
+
+
+def write_indexed(path: str, messages: Conversation) -> None:
+    """
+    Write messages as a classic JSON array (same layout as json.dump(indent=2))
+    and its sidecar in one pass. Lazy records are copied as raw bytes from
+    their source file without being parsed.
+    """
+    entries = []
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        items = messages.raw_items()
+        f.write(b"[\n" if items else b"[]")
+        offset = 2
+        for i, item in enumerate(items):
+            separator = b",\n  " if i else b"  "
+            f.write(separator)
+            offset += len(separator)
+            if isinstance(item, LazyRecord):
+                body = item.raw()
+                entry = [offset, len(body), item.role, item.content_length, item.digest]
+            else:
+                body = json.dumps(item, indent=2, default=json_default).replace("\n", "\n  ").encode("utf-8")
+                entry = [offset, len(body), item.get("role"), content_length(item), digest(body)]
+            f.write(body)
+            entries.append(entry)
+            offset += len(body)
+        if items:
+            f.write(b"\n]")
+    os.replace(tmp_path, path)
+    _save_sidecar(path, entries)
@@ -2,16 +2,24 @@
 # main.py
 
 import os
+import copy
 import argparse
 import traceback
+from typing import Callable, Deque, Dict, List, Optional
 
 from logger import llt_logger
+from profiler import startup_profiler, parse_budget
 from utils import Colors, llt_input
+from jobs import JobManager
+from history import Conversation, History
+from command_log import command_log
+from ll_codecs import CODECS
 from plugins import (
     load_plugins, 
     add_plugin_arguments,
     init_cmd_map,
     schedule_startup_commands,
+    split_command_argument,
     ScheduledCommand
 )
 
@@ -25,6 +33,13 @@ def parse_arguments() -> argparse.Namespace:
     parser.add_argument('--max_tokens', type=int, help="Max tokens to generate", default=8192)
     parser.add_argument('--logprobs', type=int, help="Include logprobs in completion", default=0)
     parser.add_argument('--top_p', type=float, help="Top-p sampling", default=1.0)
+    parser.add_argument('--completion_cache', action='store_true',
+                        help="Reuse stored completions for identical requests at temperature 0 (see the cache command).")
+    parser.add_argument('--hedge', action='store_true',
+                        help="Send completions to the model's backup in config.yaml hedging when the first token is late.")
+    parser.add_argument('--context_policy', type=str, default="images,tools,oldest",
+                        help="Steps used to fit the context window before a completion, in order "
+                             "(images, tools, oldest), or 'none'.")
 
     parser.add_argument('--cmd_dir', type=str, default=os.path.join(os.getenv('LLT_PATH', ''), 'cmd'))
     parser.add_argument('--exec_dir', type=str, default=os.path.join(os.getenv('LLT_PATH', ''), 'exec'))
@@ -33,6 +48,27 @@ def parse_arguments() -> argparse.Namespace:
     parser.add_argument('--tools', action='store_true', help="Enable tool usage calls.")
     parser.add_argument('--non_interactive', '-n', action='store_true', 
                         help="Run in non-interactive mode.")
+
+    parser.add_argument('--journal', action='store_true',
+                        help="Save .ll files as append-only journals (existing journals are always extended).")
+
+    parser.add_argument('--codec', type=str, default=None, choices=["json", *CODECS],
+                        help="Format for written conversations; the file extension is changed to match.")
+
+    parser.add_argument('--max_jobs', type=int, default=2,
+                        help="Worker threads for background jobs (run a command with a trailing '&').")
+
+    parser.add_argument('--batch_workers', type=int, default=8,
+                        help="Files completed at once by the batch command.")
+    parser.add_argument('--batch_retries', type=int, default=3,
+                        help="Retries of rate-limited, overloaded or dropped requests per file in a batch.")
+
+    parser.add_argument('--profile_startup', '--profile-startup', action='store_true',
+                        help="Report time spent in each startup phase and plugin import.")
+    parser.add_argument('--profile_json', type=str, default=None,
+                        help="Also write the startup profile to this JSON file.")
+    parser.add_argument('--startup_budget', type=str, default=None,
+                        help="Plugin import budget in ms, e.g. '150,embeddings=1500'.")
     
     return parser
 
@@ -63,17 +99,74 @@ def display_greeting(username: str, args: argparse.Namespace) -> None:
     print(header)
 
 
-def llt_shell_log(cmd: str) -> None:
-    """Log shell commands to a log file."""
-    llt_path = os.getenv("LLT_PATH", "")
-    if not llt_path:
-        return
-    file_path = os.path.join(llt_path, "llt_shell.log")
-    try:
-        with open(file_path, "a") as logfile:
-            logfile.write(f"llt> {cmd}\n")
-    except Exception as e:
-        Colors.print_colored(f"Failed to log shell command '{cmd}': {e}", Colors.RED)
+def print_startup_profile(args: argparse.Namespace) -> None:
+    """Print startup phases sorted by duration, flagging plugins over budget."""
+    budget = parse_budget(args.startup_budget)
+    flagged = startup_profiler.over_budget(budget)
+
+    Colors.print_bold("Startup profile:", Colors.YELLOW)
+    for timing in startup_profiler.sorted_timings():
+        line = f"  {timing.seconds * 1000:9.2f} ms  [{timing.category}] {timing.name}"
+        if timing in flagged:
+            limit = budget.get(timing.plugin, budget.get("default"))
+            Colors.print_colored(f"{line}  (over budget: {limit:.0f} ms)", Colors.RED)
+        else:
+            print(line)
+    total = startup_profiler.to_dict()["total_seconds"]
+    Colors.print_colored(f"  {total * 1000:9.2f} ms  total startup (before the first command)", Colors.YELLOW)
+
+    if args.profile_json:
+        startup_profiler.write_json(args.profile_json, budget)
+        Colors.print_colored(f"Startup profile written to {args.profile_json}", Colors.GREEN)
+
+
+def execute_command(
+    cmd_map: Dict[str, Callable],
+    cmd_name: str,
+    messages: List[Dict],
+    args: argparse.Namespace,
+    index: int,
+    command_queue: Deque[ScheduledCommand],
+    history: Optional[History] = None
+) -> Conversation:
+    """Run one command (or add a user message) and return the new conversation."""
+    messages = Conversation(messages)
+    cmd_name = split_command_argument(cmd_map, cmd_name, args)
+    if cmd_name in cmd_map:
+        print(f"\nExecuting command: {cmd_name}")
+        messages_before = messages.snapshot()
+        messages = Conversation(cmd_map[cmd_name](messages, args, index))
+        if history and cmd_map[cmd_name] not in (history.undo, history.redo):
+            history.record(messages_before, messages)
+
+        # if the last message is a llt message, add it to the command queue
+        if messages and messages[-1]["role"] == "llt":
+            print(f"LLT role message detected: {messages[-1]['content']}")
+            if not args.non_interactive:
+                if input("Add this LLT command to queue? (y/N): ").lower() == 'y':
+                    command_queue.append(ScheduledCommand(messages[-1]["content"], index))
+                    print("Command added to queue")
+                else:
+                    print("Command skipped")
+            else:
+                command_queue.append(ScheduledCommand(messages[-1]["content"], index))
+                print("Command automatically queued in non-interactive mode")
+        
+        command_log.log_command(cmd_name, messages_before, messages, args)
+        print(f"Command {cmd_name} completed")
+    else:
+        # Treat as user message if not a command
+        print(f"\nAdding user message with role '{args.role}'")
+        messages_before = messages.snapshot()
+        messages.append({'role': args.role, 'content': cmd_name})
+        if history:
+            history.record(messages_before, messages.snapshot())
+        print(f"Added message of length {len(cmd_name)}")
+        llt_logger.log_info("User input added", {
+            "role": args.role, 
+            "content_length": len(cmd_name)
+        })
+    return messages
 
 
 def llt() -> None:
@@ -81,27 +174,50 @@ def llt() -> None:
     load_plugins(plugin_dir)
     
     # add plugin arguments to parser
-    parser = parse_arguments()
-    add_plugin_arguments(parser)
-    args = parser.parse_args()
+    with startup_profiler.phase("add_plugin_arguments"):
+        parser = parse_arguments()
+        add_plugin_arguments(parser)
+        args = parser.parse_args()
     
-    init_directories(args)
-    messages = []
+    with startup_profiler.phase("init_directories"):
+        init_directories(args)
+    messages = Conversation()
+    history = History()
 
-    cmd_map = init_cmd_map()
+    with startup_profiler.phase("init_cmd_map"):
+        cmd_map = init_cmd_map()
+
+    job_manager = JobManager(cmd_map, args.max_jobs)
+    cmd_map["jobs"] = job_manager.list_jobs
+    cmd_map["wait"] = job_manager.wait
+    cmd_map["cancel"] = job_manager.cancel
+    cmd_map["undo"] = history.undo
+    cmd_map["redo"] = history.redo
+
+    # plugins are loaded and arguments parsed: startup ends here, before any command runs
+    startup_profiler.finish()
 
     # Initialize command queue with startup commands received from parser
     command_queue = schedule_startup_commands(args)
+    # reported once the startup commands have run, so lazily imported plugins are listed too
+    profile_pending = args.profile_startup
 
     Colors.print_header()
     print(user_greeting(os.getenv('USER', 'User'), args))
     while True:
         try:
+            # merge finished background jobs before the next command
+            messages = job_manager.collect(messages, history)
+
             # Get next command, either from queue or interactive input
             if command_queue:
                 cmd = command_queue.popleft()
                 cmd_name, index = cmd.name, cmd.index
                 print(f"Executing queued command: {cmd_name} (index: {index})")
+            elif profile_pending:
+                profile_pending = False
+                print_startup_profile(args)
+                continue
             elif args.non_interactive:
                 print("Non-interactive mode complete, exiting...")
                 break
@@ -110,36 +226,15 @@ def llt() -> None:
                 cmd_name, index = llt_input(list(cmd_map.keys()))
                 print(f"Received command: {cmd_name} (index: {index})")
 
-            if cmd_name in cmd_map:
-                print(f"\nExecuting command: {cmd_name}")
-                messages_before = messages.copy()
-                messages = cmd_map[cmd_name](messages, args, index)
-
-                # if the last message is a llt message, add it to the command queue
-                if messages and messages[-1]["role"] == "llt":
-                    print(f"LLT role message detected: {messages[-1]['content']}")
-                    if not args.non_interactive:
-                        if input("Add this LLT command to queue? (y/N): ").lower() == 'y':
-                            command_queue.append(ScheduledCommand(messages[-1]["content"], index))
-                            print("Command added to queue")
-                        else:
-                            print("Command skipped")
-                    else:
-                        command_queue.append(ScheduledCommand(messages[-1]["content"], index))
-                        print("Command automatically queued in non-interactive mode")
-                
-                llt_logger.log_command(cmd_name, messages_before, messages, args)
-                llt_shell_log(cmd_name)
-                print(f"Command {cmd_name} completed")
-            else:
-                # Treat as user message if not a command
-                print(f"\nAdding user message with role '{args.role}'")
-                messages.append({'role': args.role, 'content': cmd_name})
-                print(f"Added message of length {len(cmd_name)}")
-                llt_logger.log_info("User input added", {
-                    "role": args.role, 
-                    "content_length": len(cmd_name)
-                })
+            if cmd_name.endswith("&"):
+                # the inline argument goes to the job's own args, e.g. "fanout a b &"
+                job_args = copy.copy(args)
+                job_name = split_command_argument(cmd_map, cmd_name[:-1].rstrip(), job_args)
+                if job_name in cmd_map:
+                    job_manager.submit(job_name, messages, job_args, index)
+                    continue
+
+            messages = execute_command(cmd_map, cmd_name, messages, args, index, command_queue, history)
 
         except KeyboardInterrupt:
             print("\nReceived keyboard interrupt")
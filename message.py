@@ -1,15 +1,18 @@
 # message.py
 
 import os
-import json
-from typing import Optional, Dict, List
+import sys
+import bisect
+import shutil
+from typing import Optional, Dict, List, Tuple
 
 from plugins import llt
 from utils import path_input, get_valid_index, list_input,Colors
-
-class Message(Dict):
-    role: str
-    content: any
+from history import Conversation, LazyRecord, Message
+import blobs
+import journal
+import ll_codecs
+import token_ledger
 
 
 @llt
@@ -29,8 +32,7 @@ def load(messages: List[Message], args: Dict, index: int = -1) -> List[Message]:
     os.makedirs(os.path.dirname(ll_path), exist_ok=True)
 
     if os.path.exists(ll_path):
-        with open(ll_path, 'r') as file:
-            messages = json.load(file)
+        messages = journal.read_messages(ll_path)
 
     if not args.non_interactive:
         Colors.print_colored(f"Loaded {len(messages)} messages from '{ll_path}'.", Colors.GREEN)
@@ -56,17 +58,37 @@ def write(messages: List[Message], args: Dict, index: int = -1) -> List[Message]
         ww_path = path_input(args.load, args.ll_dir)
     else:
         ww_path = os.path.join(args.ll_dir, args.write)
+    ww_path = ll_codecs.with_extension(ww_path, getattr(args, "codec", None))
 
     os.makedirs(os.path.dirname(ww_path), exist_ok=True)
 
-    with open(ww_path, "w") as file:
-        json.dump(messages, file, indent=2)
+    journal.write_messages(ww_path, messages, getattr(args, "journal", False))
     if not args.non_interactive:
         Colors.print_colored(f"Saved {len(messages)} messages to '{ww_path}'.", Colors.GREEN)
     args.write = ww_path
     return messages
 
 
+@llt
+def compact(messages: List[Message], args: Dict, index: int = -1) -> List[Message]:
+    """
+    Description: Fold a journaled ll file back into a single snapshot
+    Type: bool
+    Default: false
+    flag: compact
+    short:
+    """
+    ll_path = args.load if args.non_interactive else path_input(args.load, args.ll_dir)
+    if not journal.is_journal(ll_path):
+        Colors.print_colored(f"'{ll_path}' is not a journal; nothing to compact.", Colors.YELLOW)
+        return messages
+
+    size_before, size_after = journal.compact(ll_path)
+    if not args.non_interactive:
+        Colors.print_colored(f"Compacted '{ll_path}': {size_before} -> {size_after} bytes.", Colors.GREEN)
+    return messages
+
+
 @llt
 def prompt(messages: List[Message], args: Dict, index: int = -1) -> List[Message]:
     """
@@ -118,8 +140,7 @@ def attach(messages: List[Message], args: Optional[Dict] = None, index: int = -1
     if ll_path is None:
         return messages
 
-    with open(ll_path, 'r') as file:
-        new_messages = json.load(file)
+    new_messages = journal.read_messages(ll_path)
 
     messages.extend(new_messages)
     if not args.non_interactive:
@@ -158,11 +179,16 @@ def fold(messages: List[Message], args: Optional[Dict] = None, index: int = -1)
     flag: fold
     short:
     """
-    initial_length = len(messages)
-    while len(messages) > 1 and messages[-2]["role"] == args.role:
-        messages[-2]["content"] += "\n" + messages[-1]["content"]
-        messages.pop()
-    folded_messages = initial_length - len(messages)
+    # fold the last message and the run of args.role messages before it with a single join
+    start = len(messages) - 1
+    while start > 0 and messages[start - 1]["role"] == args.role:
+        start -= 1
+    folded_messages = len(messages) - 1 - start
+    if folded_messages > 0:
+        content = "\n".join(messages[i]["content"] for i in range(start, len(messages)))
+        folded = Message(messages[start], content=content)
+        del messages[start:]
+        messages.append(folded)
     print(f"Folded {folded_messages} message(s).")
     return messages
 
@@ -187,11 +213,152 @@ def insert(messages: List[Message], args: Optional[Dict] = None, index: int = -1
 def change_role(messages: List[Message], args: Optional[Dict] = None, index: int = -1) -> List[Message]:
     index = get_valid_index(messages, "modify role of", index)
     new_role = list_input(["user", "assistant", "system", "tool"], "Select new role for the message")
-    messages[index]["role"] = new_role
+    messages[index] = Message(messages[index], role=new_role)
     Colors.print_colored(f"Modified role of message at index {index + 1} to '{new_role}'.", Colors.GREEN)
     return messages
 
 
+VIEW_COLORS = {
+    "user": Colors.GREEN,
+    "assistant": Colors.MAGENTA,
+    "system": Colors.BLUE,
+    "llt": Colors.YELLOW,
+}
+VIEW_MAX_LINES = 60  # per text part; longer parts are truncated
+VIEW_ROLES = ("user", "assistant", "system", "tool", "llt")
+
+
+def parse_view_spec(spec: Optional[str], count: int) -> Tuple[int, int, List[str]]:
+    """
+    Parse "100-140 user assistant" into (start, end, roles): a 1-based
+    inclusive range ("100-140", "100-", "-20" for the last 20, "7") and role filters.
+    """
+    start, end, roles = 0, count, []
+    for token in (spec or "").replace(",", " ").split():
+        token = token.removeprefix("role=").removeprefix("role:")
+        if token in VIEW_ROLES:
+            roles.append(token)
+        elif token.startswith("-") and token[1:].isdigit():
+            start = max(0, count - int(token[1:]))
+        elif "-" in token:
+            first, last = token.split("-", 1)
+            start = max(0, int(first) - 1) if first else 0
+            end = min(count, int(last)) if last else count
+        elif token.isdigit():
+            start, end = max(0, int(token) - 1), min(count, int(token))
+        else:
+            raise ValueError(f"Unknown view option '{token}'")
+    return start, end, roles
+
+
+def is_view_spec(spec: str) -> bool:
+    """Whether "view <spec>" is a view command rather than a message starting with "view"."""
+    try:
+        parse_view_spec(spec, sys.maxsize)
+    except ValueError:
+        return False
+    return True
+
+
+def is_tokens_spec(spec: str) -> bool:
+    return spec == "all" or spec.isdigit()
+
+
+def _part_summary(part: Dict) -> str:
+    """One-line stand-in for an image or other binary part."""
+    if part.get("type") == "image":
+        data = part.get("source", {}).get("data", "")
+        kind = part.get("source", {}).get("media_type", "image")
+    elif part.get("type") == "image_url":
+        url = part.get("image_url", {}).get("url", "")
+        kind, _, data = url.partition(";base64,")
+        kind = kind.removeprefix("data:") if data else "image"
+        data = data or url
+    else:
+        return f"[{part.get('type', 'part')}]"
+    if data.startswith(blobs.BLOB_PREFIX):
+        return f"[{kind} {data[:len(blobs.BLOB_PREFIX) + 12]}...]"
+    if len(data) > 200:
+        return f"[{kind}, {len(data) * 3 // 4 / 1024:.1f} KiB inline]"
+    return f"[{kind} {data}]"
+
+
+def _text_lines(text: str) -> List[str]:
+    lines = text.split("\n")
+    if len(lines) > VIEW_MAX_LINES:
+        hidden = len(lines) - VIEW_MAX_LINES
+        lines = lines[:VIEW_MAX_LINES] + [f"{Colors.CYAN}... ({hidden} more lines){Colors.RESET}"]
+    return lines
+
+
+def render_message(message: Message, number: int, total: int) -> List[str]:
+    """Lines shown for one message: header, truncated text parts, binary summaries, footer."""
+    role = message["role"]
+    content = message["content"]
+    color = VIEW_COLORS.get(role, Colors.WHITE)
+    lines = [f"{color}[{role.capitalize()}]{Colors.RESET}"]
+    if isinstance(content, list):
+        for part in content:
+            if isinstance(part, dict) and part.get("type") == "text":
+                lines.extend(_text_lines(part["text"]))
+            else:
+                lines.append(f"{Colors.CYAN}{_part_summary(part) if isinstance(part, dict) else part}{Colors.RESET}")
+    else:
+        lines.extend(_text_lines(str(content)))
+    lines.append(f"{color}[/{role.capitalize()}]{Colors.RESET}")
+    lines.append(f"{Colors.YELLOW}Message {number} of {total}{Colors.RESET}")
+    lines.append("-" * 50)
+    return lines
+
+
+def _line_count(message: Message) -> int:
+    """len(render_message(message)) without building the lines."""
+    content = message["content"]
+    parts = content if isinstance(content, list) else [{"type": "text", "text": str(content)}]
+    count = 4
+    for part in parts:
+        if isinstance(part, dict) and part.get("type") == "text":
+            count += min(part["text"].count("\n") + 1, VIEW_MAX_LINES + 1)
+        else:
+            count += 1
+    return count
+
+
+class ViewWindow:
+    """
+    Selected messages with precomputed line offsets, so any page can be
+    rendered without rendering the messages before it.
+    """
+
+    def __init__(self, messages: List[Message], selected: List[int]):
+        self.messages = messages
+        self.selected = selected
+        self.offsets = [0]
+        for i in selected:
+            self.offsets.append(self.offsets[-1] + _line_count(messages[i]))
+
+    @property
+    def total_lines(self) -> int:
+        return self.offsets[-1]
+
+    def lines(self, first: int, count: int) -> List[str]:
+        """Rendered lines first..first+count, rendering only the messages they cover."""
+        out: List[str] = []
+        pos = bisect.bisect_right(self.offsets, first) - 1
+        skip = first - self.offsets[pos]
+        while len(out) < count and pos < len(self.selected):
+            i = self.selected[pos]
+            out.extend(render_message(self.messages[i], i + 1, len(self.messages))[skip:])
+            skip = 0
+            pos += 1
+        return out[:count]
+
+    def page_of_message(self, number: int, height: int) -> int:
+        """Page showing the 1-based message number (or the next selected one)."""
+        pos = bisect.bisect_left(self.selected, number - 1)
+        return self.offsets[min(pos, len(self.selected) - 1)] // height
+
+
 @llt
 def view(messages: List[Message], args: Optional[Dict] = None, index: int = 0) -> List[Message]:
     """
@@ -200,44 +367,95 @@ def view(messages: List[Message], args: Optional[Dict] = None, index: int = 0) -
     Default: false
     flag: view
     short: v
+    argument: view_spec
+    argument_check: is_view_spec
     """
+    spec = getattr(args, "view_spec", None)
+    args.view_spec = None
     if not messages:
         Colors.print_colored("No messages to display.", Colors.YELLOW)
         return messages
+    try:
+        start, end, roles = parse_view_spec(spec, len(messages))
+    except ValueError as e:
+        Colors.print_colored(f"{e}. Use e.g. 'view 100-140', 'view -20', 'view user'.", Colors.RED)
+        return messages
 
-    def view_helper(message: Message, idx: int) -> None:
-        role = message["role"]
-        content = message["content"]
-        color = {
-            "user": Colors.GREEN,
-            "assistant": Colors.MAGENTA,
-            "system": Colors.BLUE,
-            "llt": Colors.YELLOW,
-        }.get(role, Colors.WHITE)
-
-        header = f"{color}[{role.capitalize()}]{Colors.RESET}"
-        footer = f"{color}[/{role.capitalize()}]{Colors.RESET}"
-        Colors.print_colored(header, color)
-
-        if isinstance(content, list):
-            print(content)
-            for item in content:
-                if item["type"] == "text":
-                    print(item["text"])
-                elif item["type"] == "image_url":
-                    Colors.print_colored(
-                        f"Image path: {item['image_url']['url']}", Colors.CYAN
-                    )
-        else:
-            print(content)
+    # roles come from the index for lazily loaded messages, so filtering loads nothing
+    items = messages.raw_items() if isinstance(messages, Conversation) else list(messages)
+    selected = [
+        i for i in range(start, end)
+        if not roles or (items[i].role if isinstance(items[i], LazyRecord) else items[i]["role"]) in roles
+    ]
+    if not selected:
+        Colors.print_colored("No messages match.", Colors.YELLOW)
+        return messages
+
+    window = ViewWindow(messages, selected)
+    height = max(5, shutil.get_terminal_size().lines - 2)
+    if args.non_interactive or not sys.stdout.isatty() or window.total_lines <= height:
+        for line in window.lines(0, window.total_lines):
+            print(line)
+        Colors.print_colored(f"Total messages shown: {len(selected)}", Colors.YELLOW)
+        return messages
+
+    pages = (window.total_lines + height - 1) // height
+    page = 0
+    while True:
+        for line in window.lines(page * height, height):
+            print(line)
+        command = input(
+            f"{Colors.YELLOW}[page {page + 1}/{pages}] enter/n next, p prev, <page>, m<message>, q quit: {Colors.RESET}"
+        ).strip().lower()
+        if command == "q":
+            break
+        if command in ("", "n"):
+            if page + 1 >= pages:
+                break
+            page += 1
+        elif command == "p":
+            page = max(0, page - 1)
+        elif command.isdigit():
+            page = min(pages - 1, max(0, int(command) - 1))
+        elif command.startswith("m") and command[1:].isdigit():
+            page = window.page_of_message(int(command[1:]), height)
+    Colors.print_colored(f"Messages selected: {len(selected)}", Colors.YELLOW)
+    return messages
 
-        Colors.print_colored(footer, color)
-        Colors.print_colored(f"Message {idx} of {len(messages)}", Colors.YELLOW)
 
-    for i, msg in enumerate(messages, 1):
-        view_helper(msg, i)
-        print("-" * 50)  # Separator between messages
-    Colors.print_colored(f"Total messages shown: {len(messages)}", Colors.YELLOW)
+@llt
+def tokens(messages: List[Message], args: Optional[Dict] = None, index: int = -1) -> List[Message]:
+    """
+    Description: Show token counts per message and per role
+    Type: bool
+    Default: false
+    flag: tokens
+    short:
+    argument: tokens_spec
+    argument_check: is_tokens_spec
+    """
+    spec = (getattr(args, "tokens_spec", None) or "").strip()
+    args.tokens_spec = None
+    ledger = token_ledger.ledger_for(args.model)
+    ledger.update(messages)
+    if not messages:
+        Colors.print_colored("No messages.", Colors.YELLOW)
+        return messages
+
+    # "tokens all" lists every message; otherwise the most expensive ones ("tokens 20" for 20)
+    order = list(range(len(ledger.counts)))
+    if spec != "all":
+        order = sorted(order, key=ledger.counts.__getitem__, reverse=True)[:int(spec) if spec.isdigit() else 10]
+    for i in order:
+        role = ledger.roles[i]
+        color = VIEW_COLORS.get(role, Colors.WHITE)
+        preview = " ".join(str(messages[i]["content"])[:60].split()) if spec == "all" or len(order) <= 50 else ""
+        print(f"{i + 1:>6} {color}{role:<10}{Colors.RESET} {ledger.counts[i]:>8}  {preview}")
+    print("-" * 50)
+    for role, count in sorted(ledger.by_role.items(), key=lambda item: -item[1]):
+        if count:
+            print(f"{VIEW_COLORS.get(role, Colors.WHITE)}{role:<17}{Colors.RESET} {count:>8}")
+    Colors.print_colored(f"Total: {ledger.total} tokens in {len(messages)} messages ({args.model})", Colors.BLUE)
     return messages
 
 
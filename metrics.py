@@ -0,0 +1,234 @@
+# metrics.py
+# Latency metrics of every completion, in $LLT_PATH/metrics.db.
+#
+# One row per completion: time until the response headers arrived (connection
+# setup plus server queueing), time to first token, inter-token latency
+# percentiles, duration, token counts, tokens/sec and the usage the provider
+# reported. Inter-token latency is per delta event (about one token each);
+# events that arrive in the same network read share its gap evenly. The gaps
+# are also kept as a sparse log-scale histogram, so percentiles over many
+# completions are of the gaps themselves rather than of per-completion
+# percentiles.
+
+import os
+import json
+import math
+import time
+import sqlite3
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+METRICS_VERSION = 3
+RETENTION = 30 * 24 * 3600  # seconds
+BUCKET_BASE = 1.1  # histogram buckets grow by 10%: percentiles within ~5%
+BUCKET_FLOOR = 1e-4  # seconds; shorter gaps share the first bucket
+# tokens/sec needs this much of a stream; a reply that arrives in one or two
+# reads would otherwise divide by almost nothing
+MIN_RATE_SECONDS = 0.25
+MIN_RATE_ARRIVALS = 3
+
+_lock = threading.Lock()
+
+
+def db_path() -> Optional[str]:
+    llt_path = os.getenv("LLT_PATH")
+    return os.path.join(llt_path, "metrics.db") if llt_path else None
+
+
+def connect(path: Optional[str] = None) -> sqlite3.Connection:
+    db = sqlite3.connect(path or db_path())
+    if db.execute("PRAGMA user_version").fetchone()[0] != METRICS_VERSION:
+        db.executescript("""
+            DROP TABLE IF EXISTS completions;
+            CREATE TABLE completions (
+                ts REAL, provider TEXT, model TEXT, ok INTEGER,
+                connect REAL, ttft REAL, duration REAL,
+                itl_p50 REAL, itl_p95 REAL, itl_p99 REAL, itl_histogram TEXT,
+                prompt_tokens INTEGER, completion_tokens INTEGER, tokens_per_second REAL,
+                usage TEXT
+            );
+            CREATE INDEX completions_ts ON completions (ts);
+            CREATE INDEX completions_model ON completions (model, ts);  -- routing's rolling window
+        """)
+        db.execute(f"PRAGMA user_version = {METRICS_VERSION}")
+        db.commit()
+    return db
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of values, q in 0..100."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+def bucket(seconds: float) -> int:
+    return max(0, int(math.log(max(seconds, BUCKET_FLOOR) / BUCKET_FLOOR, BUCKET_BASE)))
+
+
+def bucket_value(index: int) -> float:
+    """Midpoint of a histogram bucket, in seconds."""
+    return BUCKET_FLOOR * BUCKET_BASE ** (index + 0.5)
+
+
+def histogram_percentile(histogram: Dict[int, int], q: float) -> Optional[float]:
+    total = sum(histogram.values())
+    if not total:
+        return None
+    rank = max(1, math.ceil(q / 100 * total))
+    seen = 0
+    for index in sorted(histogram):
+        seen += histogram[index]
+        if seen >= rank:
+            return bucket_value(index)
+    return None
+
+
+class CompletionTiming:
+    """
+    Timestamps of one streamed completion. The provider functions call
+    headers() when the response starts and arrived() for every network read
+    that brought delta events; finish() works out the metrics and stores them.
+    """
+
+    def __init__(self, provider: str, model: str):
+        self.provider = provider
+        self.model = model
+        self.sent = time.perf_counter()
+        self.headers_at: Optional[float] = None
+        self.arrivals: List[Tuple[float, int]] = []  # (time, delta events so far)
+        self.usage: Optional[Dict[str, Any]] = None
+        self.error: Optional[BaseException] = None  # a failure the provider function reported instead of raising
+        self.finished: Optional[float] = None
+
+    def headers(self) -> None:
+        if self.headers_at is None:
+            self.headers_at = time.perf_counter()
+
+    def arrived(self, deltas: int) -> None:
+        """A read brought the stream to deltas delta events in total."""
+        self.arrivals.append((time.perf_counter(), deltas))
+
+    def stop(self) -> None:
+        """Mark the end of the stream, when finish() is called later."""
+        self.finished = time.perf_counter()
+
+    @property
+    def ttft(self) -> Optional[float]:
+        return self.arrivals[0][0] - self.sent if self.arrivals else None
+
+    def gaps(self) -> List[float]:
+        """Seconds before each delta event after the first."""
+        gaps: List[float] = []
+        if self.arrivals:
+            gaps.extend([0.0] * (self.arrivals[0][1] - 1))  # events that came with the first
+        for (earlier, before), (later, after) in zip(self.arrivals, self.arrivals[1:]):
+            events = after - before
+            if events > 0:
+                gaps.extend([(later - earlier) / events] * events)
+        return gaps
+
+    def tokens_per_second(self, completion_tokens: int) -> Optional[float]:
+        if len(self.arrivals) < MIN_RATE_ARRIVALS:
+            return None
+        streamed = (self.finished or time.perf_counter()) - self.arrivals[0][0]
+        return completion_tokens / streamed if streamed >= MIN_RATE_SECONDS else None
+
+    def finish(self, ok: bool, prompt_tokens: Optional[int] = None, completion_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """Store the row; provider-reported usage takes precedence over the given counts."""
+        if self.finished is None:
+            self.stop()
+        usage = self.usage or {}
+        prompt_tokens = usage.get("prompt_tokens", usage.get("input_tokens", prompt_tokens))
+        completion_tokens = usage.get("completion_tokens", usage.get("output_tokens", completion_tokens))
+        gaps = self.gaps()
+        row = {
+            "ts": time.time(),
+            "provider": self.provider,
+            "model": self.model,
+            "ok": int(ok),
+            "connect": self.headers_at - self.sent if self.headers_at else None,
+            "ttft": self.ttft,
+            "duration": self.finished - self.sent,
+            "itl_p50": percentile(gaps, 50),
+            "itl_p95": percentile(gaps, 95),
+            "itl_p99": percentile(gaps, 99),
+            "itl_histogram": json.dumps(Counter(bucket(gap) for gap in gaps), separators=(",", ":")),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "tokens_per_second": self.tokens_per_second(completion_tokens or 0) if ok else None,
+            "usage": json.dumps(self.usage) if self.usage else None,
+        }
+        record(row)
+        return row
+
+
+def record(row: Dict[str, Any]) -> None:
+    if db_path() is None:
+        return
+    with _lock:
+        db = connect()
+        try:
+            db.execute(
+                f"INSERT INTO completions ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                list(row.values())
+            )
+            db.execute("DELETE FROM completions WHERE ts < ?", (time.time() - RETENTION,))
+            db.commit()
+        finally:
+            db.close()
+
+
+def parse_window(spec: Optional[str]) -> float:
+    """Seconds in a window such as "90m", "24h" or "7d"; a bare number is hours."""
+    spec = (spec or "24h").strip().lower()
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+    if spec[-1:] in units:
+        return float(spec[:-1]) * units[spec[-1]]
+    return float(spec) * 3600
+
+
+def summarize(window: float, now: Optional[float] = None) -> List[Dict[str, Any]]:
+    """p50/p95/p99 per provider and model over the last window seconds."""
+    if db_path() is None or not os.path.exists(db_path()):
+        return []
+    since = (now or time.time()) - window
+    db = connect()
+    try:
+        rows = db.execute(
+            "SELECT provider, model, ok, connect, ttft, tokens_per_second, itl_histogram, completion_tokens "
+            "FROM completions WHERE ts >= ? ORDER BY provider, model",
+            (since,)
+        ).fetchall()
+    finally:
+        db.close()
+
+    groups: Dict[tuple, List[tuple]] = {}
+    for row in rows:
+        groups.setdefault((row[0], row[1]), []).append(row)
+
+    summaries = []
+    for (provider, model), group in groups.items():
+        succeeded = [row for row in group if row[2]]
+        histogram: Counter = Counter()
+        for row in succeeded:
+            histogram.update({int(k): v for k, v in json.loads(row[6] or "{}").items()})
+
+        def values(column: int) -> List[float]:
+            return [row[column] for row in succeeded if row[column] is not None]
+
+        summaries.append({
+            "provider": provider,
+            "model": model,
+            "count": len(group),
+            "errors": len(group) - len(succeeded),
+            "tokens": sum(values(7)),
+            **{f"connect_p{q}": percentile(values(3), q) for q in (50, 95, 99)},
+            **{f"ttft_p{q}": percentile(values(4), q) for q in (50, 95, 99)},
+            **{f"itl_p{q}": histogram_percentile(histogram, q) for q in (50, 95, 99)},
+            # slow generation is the low tail of tokens/sec
+            **{f"tps_p{q}": percentile(values(5), 100 - q) for q in (50, 95, 99)},
+        })
+    return summaries
@@ -1,15 +1,50 @@
 # plugins/__init__.py
 
 import os
+import sys
+import ast
+import json
+import hashlib
+import importlib
 import importlib.util
-from typing import Callable, Dict, Any, Optional
+from typing import Callable, Dict, Any, Optional, List
 from logger import llt_logger
+from profiler import startup_profiler
 import argparse
 import re
 from collections import deque
 from dataclasses import dataclass
 
 _plugins_registry: Dict[str, Dict[str, Any]] = {}
+_loaded_modules: Dict[str, Any] = {}
+
+MANIFEST_VERSION = 3
+
+
+def parse_plugin_doc(name: str, doc: str) -> Dict[str, Any]:
+    """
+    Parse the @llt docstring metadata (description, type, default, flag, short,
+    argument, argument_check) of a plugin function. Shared by the decorator and the manifest scanner so
+    both produce identical registry entries.
+    """
+    desc_match = re.search(r"Description:\s*(.*)", doc)
+    type_match = re.search(r"Type:\s*(.*)", doc)
+    default_match = re.search(r"Default:\s*(.*)", doc)
+    flag_match = re.search(r"flag:\s*(.*)", doc)
+    short_match = re.search(r"short:\s*(.*)", doc)
+    argument_match = re.search(r"argument:\s*(\w+)", doc)
+    check_match = re.search(r"argument_check:\s*(\w+)", doc)
+
+    default = default_match.group(1).strip() if default_match else None
+    return {
+        'description': desc_match.group(1).strip() if desc_match else name,
+        'type': type_match.group(1).strip() if type_match else None,
+        'default': default if default != "None" else None,
+        'flag': flag_match.group(1).strip() if flag_match else name,
+        'short': short_match.group(1).strip() if short_match else None,
+        'argument': argument_match.group(1) if argument_match else None,
+        'argument_check': check_match.group(1) if check_match else None
+    }
 
 
 def llt(fn: Callable) -> Callable:
@@ -23,6 +58,8 @@ def llt(fn: Callable) -> Callable:
         Default: ...
         flag: ...
         short: ...
+        argument: ...   (optional: args attribute for an inline shell argument, e.g. "view 1-20")
+        argument_check: ...   (optional: predicate in the same module that accepts the argument)
 
     Example:
         @llt
@@ -38,27 +75,11 @@ def llt(fn: Callable) -> Callable:
 
     We'll store these in _plugins_registry for later argument parsing and command mapping.
     """
-    doc = fn.__doc__ or ""
-
-    desc_match = re.search(r"Description:\s*(.*)", doc)
-    type_match = re.search(r"Type:\s*(.*)", doc)
-    default_match = re.search(r"Default:\s*(.*)", doc)
-    flag_match = re.search(r"flag:\s*(.*)", doc)
-    short_match = re.search(r"short:\s*(.*)", doc)
-
-    description = desc_match.group(1).strip() if desc_match else fn.__name__
-    arg_type = type_match.group(1).strip() if type_match else None
-    default = default_match.group(1).strip() if default_match else None
-    flag = flag_match.group(1).strip() if flag_match else fn.__name__
-    short = short_match.group(1).strip() if short_match else None
-
+    # keep manifest fields (source path, module) if the entry was registered lazily
     _plugins_registry[fn.__name__] = {
+        **_plugins_registry.get(fn.__name__, {}),
         'function': fn,
-        'description': description,
-        'type': arg_type,
-        'default': default if default != "None" else None,
-        'flag': flag,
-        'short': short
+        **parse_plugin_doc(fn.__name__, fn.__doc__ or "")
     }
     return fn
 
@@ -118,25 +139,187 @@ def add_plugin_arguments(parser: argparse.ArgumentParser) -> None:
                 help=description
             )
 
-def load_plugins(plugin_dir: str) -> None:
+def _manifest_path() -> str:
+    return os.path.join(os.getenv("LLT_PATH", ""), "plugin_manifest.json")
+
+
+def _read_manifest(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+    return {"version": MANIFEST_VERSION, "files": {}}
+
+
+def _write_manifest(path: str, manifest: Dict[str, Any]) -> None:
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        llt_logger.log_error("Failed to write plugin manifest", {"error": str(e)})
+
+
+def _is_llt_decorated(node: ast.AST) -> bool:
+    return any(
+        (isinstance(d, ast.Name) and d.id == "llt") or
+        (isinstance(d, ast.Attribute) and d.attr == "llt")
+        for d in node.decorator_list
+    )
+
+
+def scan_plugin_source(source: bytes, file_path: str) -> Dict[str, List]:
+    """
+    Statically extract @llt metadata and top-level imports from a module
+    without executing it.
+    """
+    tree = ast.parse(source, filename=file_path)
+    imports, entries = [], []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            imports.extend(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            imports.append(node.module.split(".")[0])
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and _is_llt_decorated(node):
+            doc = ast.get_docstring(node, clean=False) or ""
+            entries.append({'name': node.name, **parse_plugin_doc(node.name, doc)})
+    return {"imports": imports, "entries": entries}
+
+
+def manifest_record(file_path: str, manifest: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     """
-    Dynamically load Python scripts from 'plugin_dir'.
-    Each script can import @llt from here to register functions.
+    Return the cached manifest record for file_path, rescanning only when
+    its mtime/size changed and its content hash no longer matches.
+    """
+    stat = os.stat(file_path)
+    record = manifest["files"].get(file_path)
+    if record and record["mtime"] == stat.st_mtime and record["size"] == stat.st_size:
+        return record
+
+    with open(file_path, 'rb') as f:
+        source = f.read()
+    digest = hashlib.sha1(source).hexdigest()
+    if not record or record["sha1"] != digest:
+        try:
+            record = {"sha1": digest, **scan_plugin_source(source, file_path)}
+        except SyntaxError as e:
+            llt_logger.log_error(f"Failed to scan {file_path}", {"error": str(e)})
+            return None
+    record.update(mtime=stat.st_mtime, size=stat.st_size)
+    manifest["files"][file_path] = record
+    manifest["dirty"] = True
+    return record
+
+
+def import_plugin_module(file_path: str, module_name: str, in_plugin_dir: bool = True) -> Any:
+    """
+    Execute a plugin module once; its @llt decorators fill in the real functions.
+    Modules outside the plugin directory (e.g. message.py) are imported normally,
+    the same way a plugin's own import statement would have imported them.
+    """
+    if file_path in _loaded_modules:
+        return _loaded_modules[file_path]
+    with startup_profiler.phase(f"import {module_name}", "plugin", module_name):
+        if in_plugin_dir:
+            spec = importlib.util.spec_from_file_location(module_name, file_path)
+            module = importlib.util.module_from_spec(spec)
+            if module and spec.loader:
+                # registered first, as the import system does, so the module can be
+                # imported by name (pickling, dataclasses, circular imports) while it runs
+                sys.modules[module_name] = module
+                try:
+                    spec.loader.exec_module(module)
+                except BaseException:
+                    del sys.modules[module_name]
+                    raise
+        else:
+            module = importlib.import_module(module_name)
+    _loaded_modules[file_path] = module
+    return module
+
+
+def load_plugins(plugin_dir: str, lazy: bool = True) -> None:
+    """
+    Register plugins from the Python scripts in 'plugin_dir'.
+
+    By default only the cached plugin manifest is consulted: each plugin's @llt
+    metadata is read statically and keyed by file mtime/hash, and the module
+    itself is imported the first time one of its commands is dispatched.
+    Pass lazy=False to execute every module up front.
     """
     if not os.path.isdir(plugin_dir):
         return
 
-    for filename in os.listdir(plugin_dir):
-        if filename.endswith(".py") and not filename.startswith("__"):
-            file_path = os.path.join(plugin_dir, filename)
+    filenames = [
+        filename for filename in os.listdir(plugin_dir)
+        if filename.endswith(".py") and not filename.startswith("__")
+    ]
+
+    if not lazy:
+        for filename in filenames:
             module_name = filename[:-3]
-            spec = importlib.util.spec_from_file_location(module_name, file_path)
             try:
-                module = importlib.util.module_from_spec(spec)
-                if module and spec.loader:
-                    spec.loader.exec_module(module)
+                import_plugin_module(os.path.join(plugin_dir, filename), module_name)
             except ImportError as e:
                 llt_logger.log_error(f"Failed to import {module_name}", {"error": str(e)})
+        return
+
+    manifest_path = _manifest_path()
+    manifest = _read_manifest(manifest_path)
+    root_dir = os.path.dirname(os.path.abspath(plugin_dir))
+    seen = set()
+
+    def register(file_path: str, module_name: str, in_plugin_dir: bool) -> None:
+        if file_path in seen:
+            return
+        seen.add(file_path)
+        record = manifest_record(file_path, manifest)
+        if record is None:
+            return
+        # local modules imported by a plugin register their commands first,
+        # mirroring the order an eager import would produce
+        for imported in record["imports"]:
+            candidate = os.path.join(root_dir, f"{imported}.py")
+            if os.path.isfile(candidate):
+                register(candidate, imported, False)
+        for entry in record["entries"]:
+            info = {k: v for k, v in entry.items() if k != 'name'}
+            _plugins_registry.setdefault(entry['name'], {
+                'function': None,
+                **info,
+                'path': file_path,
+                'module': module_name,
+                'in_plugin_dir': in_plugin_dir
+            })
+
+    with startup_profiler.phase("load_plugins (manifest)"):
+        for filename in filenames:
+            register(os.path.abspath(os.path.join(plugin_dir, filename)), filename[:-3], True)
+
+        if manifest.pop("dirty", False):
+            _write_manifest(manifest_path, manifest)
+
+
+def resolve_plugin(plugin_name: str) -> Callable:
+    """Return the plugin function, importing its module on first use."""
+    info = _plugins_registry[plugin_name]
+    if info['function'] is None:
+        import_plugin_module(info['path'], info['module'], info['in_plugin_dir'])
+        info = _plugins_registry[plugin_name]
+        if info['function'] is None:
+            raise ImportError(f"Plugin {plugin_name} not found in {info['path']}; manifest is stale.")
+    return info['function']
+
+
+def _lazy_command(plugin_name: str) -> Callable:
+    def command(messages, args, index=-1):
+        return resolve_plugin(plugin_name)(messages, args, index)
+    command.__name__ = plugin_name
+    return command
 
 
 def help(messages, args, index):
@@ -151,19 +334,20 @@ def init_cmd_map() -> Dict[str, Callable]:
     """Initialize a command map with plugin commands and their abbreviations."""
     n_abbv = lambda s, n=1: s[:n].lower()
     cmd_map = {}
-    for _, info in _plugins_registry.items():
+    for plugin_name, info in _plugins_registry.items():
         cmd_name = info['flag']
+        function = info['function'] or _lazy_command(plugin_name)
         if cmd_name not in cmd_map:
-            cmd_map[cmd_name] = info['function']
+            cmd_map[cmd_name] = function
         if n_abbv(cmd_name) not in cmd_map:
-            cmd_map[n_abbv(cmd_name)] = info['function']
+            cmd_map[n_abbv(cmd_name)] = function
         elif len(cmd_name) > 2 and n_abbv(cmd_name, 2) not in cmd_map:
-            cmd_map[n_abbv(cmd_name, 2)] = info['function']
+            cmd_map[n_abbv(cmd_name, 2)] = function
         seps = ["-", "_"]
         for sep in seps:
             split_cmd = cmd_name.split(sep)
             if split_cmd:
-                cmd_map[split_cmd[0]] = info['function']
+                cmd_map[split_cmd[0]] = function
                 
     cmd_map["h"] = cmd_map["help"] = help
     cmd_map["q"] = cmd_map["quit"] = quit
@@ -177,6 +361,30 @@ class ScheduledCommand:
     index: int  # Position in message list or -1
     args: Optional[dict] = None  # Any additional args needed for command
 
+def split_command_argument(cmd_map: Dict[str, Callable], raw_cmd: str, args) -> str:
+    """
+    Split "cmd rest" for plugins that declare an inline argument: the rest is
+    stored in args.<argument> and the bare command name is returned. Only the
+    full command name splits, never an abbreviation, and only when the
+    plugin's argument_check accepts rest, so "search for the bug in..." or
+    "b remove..." stay user messages. Any other input is returned unchanged.
+    """
+    name, _, rest = raw_cmd.partition(" ")
+    rest = rest.strip()
+    if not rest or name not in cmd_map:
+        return raw_cmd
+    plugin_name = getattr(cmd_map[name], "__name__", "")
+    info = _plugins_registry.get(plugin_name, {})
+    if not info.get('argument') or name != info['flag']:
+        return raw_cmd
+    if info.get('argument_check'):
+        check = resolve_plugin(plugin_name).__globals__[info['argument_check']]
+        if not check(rest):
+            return raw_cmd
+    setattr(args, info['argument'], rest)
+    return name
+
+
 def schedule_startup_commands(args) -> deque[ScheduledCommand]:
     """Convert CLI args into a queue of commands to execute"""
     command_queue: deque[ScheduledCommand] = deque()
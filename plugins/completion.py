@@ -1,14 +1,34 @@
 # completion.py
 import requests
 import os
+import sys
+import shutil
 import yaml
 import json
-from typing import List, Dict, Any
+import copy
+import glob
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List, Dict, Any, Callable, Optional
 
 from message import Message
+import batch as batch_runner
+import blobs
+import completion_cache
+import context_budget
+import hedging
+import http_clients
+import journal
+import metrics
+import rate_limit
+import routing
+import sse
+import token_ledger
 from utils import list_input, content_input, encode_image_to_base64, Colors
 from plugins import llt
-import anthropic  # For anthropic Client usage, if needed
+from profiler import startup_profiler
+from logger import llt_logger
 
 
 def load_config(path: str):
@@ -28,8 +48,19 @@ def list_model_names(providers: Dict[str, Any]) -> List[str]:
     ]
 
 
-api_config = load_config(os.path.join(os.getenv("LLT_PATH", ""), "config.yaml"))
-full_model_choices = list_model_names(api_config["providers"])
+with startup_profiler.phase("completion: load_config", "module"):
+    api_config = load_config(os.path.join(os.getenv("LLT_PATH", ""), "config.yaml"))
+http_clients.configure(api_config)
+rate_limit.configure(api_config)
+routing.configure(api_config)
+full_model_choices = list_model_names(api_config["providers"]) + list(routing.aliases())
+
+
+CANDIDATE_LABEL = "model"  # key naming the model of a fanout candidate; saved in .ll files, not sent to providers
+
+
+def print_text(text: str) -> None:
+    print(text, end="", flush=True)
 
 
 def get_provider_details(model_name: str):
@@ -53,63 +84,92 @@ def send_request(
     completion_url: str,
     api_key_string: str,
     messages: List[Dict[str, Any]],
-    args: Dict[str, Any]
+    args: Dict[str, Any],
+    provider: str = "*",
+    on_text: Optional[Callable[[str], None]] = None,
+    raise_errors: bool = False,
+    timing: Optional[metrics.CompletionTiming] = None
 ) -> Dict[str, Any]:
     """
-    Generic request to a completion endpoint that streams tokens.
+    Generic request to a completion endpoint that streams tokens, over the
+    provider's pooled keep-alive session. Text goes to on_text, or the
+    terminal when it is None. Failed requests are reported and give an empty
+    reply, unless raise_errors is set. timing, if given, gets the time the
+    response headers arrived, the arrival of every delta event and the usage
+    the provider reports.
     """
     headers = {
         "Authorization": f"Bearer {os.getenv(api_key_string)}",
         "Content-Type": "application/json",
     }
     data = {
-        "messages": messages,
+        "messages": list(messages),
         "model": args.model,
         "max_completion_tokens": args.max_tokens,
         "temperature": args.temperature,
         "max_tokens": args.max_tokens,
         "stream": True,
+        "stream_options": {"include_usage": True},
     }
 
-    full_response_content = ""
+    stream = sse.ChatStream()
+
+    def show(text: str) -> None:
+        if timing:
+            timing.arrived(stream.deltas)
+        (on_text or print_text)(text)
+
     try:
-        with requests.post(
-            completion_url, headers=headers, json=data, stream=True
+        with http_clients.session(completion_url, provider).post(
+            completion_url, headers=headers, json=data, stream=True,
+            timeout=http_clients.timeout(provider)
         ) as response:
+            if timing:
+                timing.headers()
             response.raise_for_status()
-            for chunk in response.iter_lines():
-                if chunk:
-                    decoded_chunk = chunk.decode("utf-8")
-                    if decoded_chunk.startswith("data: [DONE]"):
-                        break
-                    if decoded_chunk.startswith("data: "):
-                        payload = decoded_chunk[len("data: "):]
-                        json_data = json.loads(payload)
-                        choice = json_data["choices"][0]
-                        delta = choice["delta"]
-                        finish_reason = choice["finish_reason"]
-
-                        if finish_reason is None:
-                            text = delta.get("content") or delta.get("reasoning_content") or ""
-                            print(text, end="", flush=True)
-                            full_response_content += text
-                        if finish_reason == "stop":
-                            print("\r")
-                            break
+            with hedging.cancellable(lambda: http_clients.abort(response)):
+                stream.consume(response.iter_content(chunk_size=None), show)
+            if on_text is None:
+                print("\r")
     except requests.RequestException as e:
+        rate_limit.limiter_for(provider).note_error(e)
+        if raise_errors:
+            raise
+        if timing:
+            timing.error = e
         print(f"Request failed: {e}")
         if e.response is not None:
             print(f"Error details: {e.response.status_code}\n{e.response.text}")
-
-    return {"role": "assistant", "content": full_response_content}
+    except ValueError as e:
+        if raise_errors:
+            raise
+        if timing:
+            timing.error = e
+        Colors.print_colored(f"\nMalformed stream event: {e}", Colors.RED)
+
+    if timing:
+        timing.usage = stream.usage
+    if stream.finish_reason not in (None, "stop", "tool_calls"):
+        Colors.print_colored(f"Completion ended early (finish_reason: {stream.finish_reason})", Colors.YELLOW)
+    llt_logger.log_info("Completion streamed", {
+        "model": args.model,
+        "finish_reason": stream.finish_reason,
+        "usage": stream.usage,
+    })
+    return stream.message()
 
 
-def get_anthropic_completion(messages: List[Dict[str, Any]], args: Dict[str, Any]) -> Dict[str, Any]:
+def get_anthropic_completion(
+    messages: List[Dict[str, Any]],
+    args: Dict[str, Any],
+    on_text: Optional[Callable[[str], None]] = None,
+    timing: Optional[metrics.CompletionTiming] = None
+) -> Dict[str, Any]:
     """
     Use the Anthropic python client for streaming completions with tool support.
     """
-    anthropic_client = anthropic.Client()
-    
+    anthropic_client = http_clients.anthropic_client()
+
     # Extract system prompt if present
     if messages and messages[0].get("role") == "system":
         system_prompt = messages[0]["content"]
@@ -129,7 +189,7 @@ def get_anthropic_completion(messages: List[Dict[str, Any]], args: Dict[str, Any
     params = {
         "model": args.model,
         "system": system_prompt,
-        "messages": messages,
+        "messages": list(messages),
         "temperature": args.temperature,
         "max_tokens": args.max_tokens,
     }
@@ -137,21 +197,160 @@ def get_anthropic_completion(messages: List[Dict[str, Any]], args: Dict[str, Any
     
         
     with anthropic_client.messages.stream(**params) as stream:
-        for text in stream.text_stream:
-            print(text, end="", flush=True)
-            response_content += text
-        print("\r")
+        if timing:
+            timing.headers()
+        with hedging.cancellable(lambda: http_clients.abort(stream.response)):
+            for deltas, text in enumerate(stream.text_stream, 1):
+                if timing:
+                    timing.arrived(deltas)
+                (on_text or print_text)(text)
+                response_content += text
+        if on_text is None:
+            print("\r")
+        if timing:
+            usage = stream.get_final_message().usage
+            timing.usage = {"input_tokens": usage.input_tokens, "output_tokens": usage.output_tokens}
     return {"role": "assistant", "content": response_content}
 
 
     
-def get_local_completion(messages: List[Message], args: Dict[str, Any]) -> Dict[str, Any]:
+def get_local_completion(
+    messages: List[Message],
+    args: Dict[str, Any],
+    on_text: Optional[Callable[[str], None]] = None
+) -> Dict[str, Any]:
     """
     Placeholder for a local LLM or other offline approach.
     """
     return {"role": "assistant", "content": "[local model output]"}
 
 
+def fit_context(payload: List[Dict[str, Any]], args: Dict) -> Optional[List[Dict[str, Any]]]:
+    """
+    Trim payload to the model's context window less max_tokens, following
+    args.context_policy, and report what was trimmed. Returns None when it
+    cannot be made to fit, so the request is not sent only to be rejected.
+    """
+    window = context_budget.context_window(args.model, api_config["providers"])
+    budget = window - args.max_tokens
+    if budget <= 0:
+        # nothing would fit; trimming would drop the whole conversation first
+        Colors.print_colored(
+            f"max_tokens {args.max_tokens:,} leaves no room for the conversation in the {window:,} token "
+            f"window of {args.model}; lower --max_tokens. Not sent.",
+            Colors.RED
+        )
+        return None
+    try:
+        payload, report, total = context_budget.fit_to_budget(
+            payload, args.model, budget, getattr(args, "context_policy", None)
+        )
+    except ValueError as e:
+        Colors.print_colored(f"Context budget: {e}", Colors.RED)
+        return None
+    if report:
+        Colors.print_colored(f"Context budget: {'; '.join(report)}", Colors.YELLOW)
+    if total > budget:
+        Colors.print_colored(
+            f"Conversation needs {total:,} tokens but {args.model} leaves {budget:,} "
+            f"({window:,} window - {args.max_tokens:,} max_tokens); not sent.",
+            Colors.RED
+        )
+        return None
+    return payload
+
+
+def unlabeled(message: Message) -> Dict[str, Any]:
+    """Provider copy of a message, without the model label fanout adds to candidates."""
+    payload = dict(message)
+    payload.pop(CANDIDATE_LABEL, None)
+    return payload
+
+
+def run_completion(
+    messages: List[Message],
+    args: Dict,
+    on_text: Optional[Callable[[str], None]] = None,
+    raise_errors: bool = False,
+    priority: Optional[int] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    One completion of messages with args.model: resolve a model alias, fit the
+    context budget, check the completion cache, then wait for the provider's
+    rate limiter and stream from it, recording latency in the metrics store,
+    which routing also reads. Returns None when the conversation cannot be fitted. priority defaults to
+    interactive on the main thread and background elsewhere.
+    """
+    if routing.is_alias(args.model):
+        args = copy.copy(args)
+        args.model = routing.resolve(args.model)
+    provider, api_key, completion_url = get_provider_details(args.model)
+    payload = fit_context([unlabeled(message) for message in messages], args)
+    if payload is None:
+        return None
+
+    cache_key = None
+    # only deterministic requests: at temperature > 0 a cached reply would replace a fresh sample
+    if getattr(args, "completion_cache", False) and float(args.temperature) == 0:
+        cache_key = completion_cache.request_key(
+            provider, args.model, payload, args.temperature, args.max_tokens, args.top_p
+        )
+        cached = completion_cache.get(cache_key)
+        if cached is not None:
+            (on_text or print_text)(cached["content"])
+            if on_text is None:
+                print("\r")
+            return cached
+
+    if priority is None:
+        on_main_thread = threading.current_thread() is threading.main_thread()
+        priority = rate_limit.INTERACTIVE if on_main_thread else rate_limit.BACKGROUND
+    prompt_tokens = sum(token_ledger.count_message(message, args.model) for message in payload)
+    limiter = rate_limit.limiter_for(provider)
+
+    with limiter.slot(prompt_tokens + args.max_tokens, priority) as ticket:
+        if hedging.cancelled():
+            # the other attempt won while this one waited for its slot
+            ticket.actual = 0
+            raise hedging.HedgeCancelled()
+        payload = [blobs.materialize(message) for message in payload]
+        timing = metrics.CompletionTiming(provider, args.model)
+        show = on_text or print_text
+        try:
+            if provider == "anthropic":
+                completion = get_anthropic_completion(payload, args, show, timing)
+            elif provider == "local":
+                completion = get_local_completion(payload, args, show)
+            else:
+                completion = send_request(
+                    completion_url, api_key, payload, args, provider, show, raise_errors, timing
+                )
+        except hedging.HedgeCancelled:
+            raise
+        except Exception as e:
+            if hedging.cancelled():
+                # a losing hedge whose stream was aborted, not a failure of the model
+                raise hedging.HedgeCancelled() from e
+            limiter.note_error(e)
+            timing.finish(ok=False, prompt_tokens=prompt_tokens)  # also routing's sample
+            raise
+        if hedging.cancelled():
+            raise hedging.HedgeCancelled()
+        timing.stop()
+        completion_tokens = token_ledger.count_message(completion, args.model)
+        ticket.actual = prompt_tokens + completion_tokens
+    if on_text is None:
+        print("\r")
+
+    # an empty reply that ended normally is a success; only errors count against the model
+    timing.finish(timing.error is None, prompt_tokens, completion_tokens)
+
+    if cache_key and completion.get("content"):
+        max_bytes = (api_config.get("completion_cache") or {}).get("max_bytes", completion_cache.DEFAULT_MAX_BYTES)
+        completion_cache.put(cache_key, completion, int(max_bytes))
+    return completion
+
+
 @llt
 def complete(messages: List[Message], args: Dict, index: int = -1) -> List[Message]:
     """
@@ -161,16 +360,291 @@ def complete(messages: List[Message], args: Dict, index: int = -1) -> List[Messa
     flag: complete
     short:
     """
-    provider, api_key, completion_url = get_provider_details(args.model)
+    backup = (api_config.get("hedging") or {}).get("backups", {}).get(args.model)
+    if getattr(args, "hedge", False) and backup:
+        completion = complete_hedged(messages, args, backup)
+    else:
+        completion = run_completion(messages, args)
+    if completion is not None:
+        messages.append(completion)
+    return messages
+
+
+def complete_hedged(messages: List[Message], args: Dict, backup: str) -> Optional[Dict[str, Any]]:
+    """run_completion with a hedge to backup when the first token is late (see hedging.py)."""
+    deadline = float((api_config.get("hedging") or {}).get("deadline", hedging.DEFAULT_DEADLINE))
+
+    def run(model: str, on_text: Callable[[str], None]) -> Optional[Dict[str, Any]]:
+        model_args = copy.copy(args)
+        model_args.model = model
+        return run_completion(messages, model_args, on_text, raise_errors=True, priority=rate_limit.INTERACTIVE)
 
-    if provider == "anthropic":
-        completion = get_anthropic_completion(messages, args)
-    elif provider == "local":
-        completion = get_local_completion(messages, args)
+    winner = hedging.run_hedged(run, args.model, backup, deadline, print_text)
+    print("\r")
+    if winner.model == backup:
+        Colors.print_colored(
+            f"No first token from {args.model} within {deadline:g}s; answered by {backup}.", Colors.YELLOW
+        )
+    if winner.error is not None:
+        Colors.print_colored(f"Completion failed: {winner.error}", Colors.RED)
+        return None
+    return winner.result
+
+
+def is_model_list(spec: str) -> bool:
+    models = spec.replace(",", " ").split()
+    return bool(models) and all(model in full_model_choices for model in models)
+
+
+@llt
+def fanout(messages: List[Message], args: Dict, index: int = -1) -> List[Message]:
+    """
+    Description: Complete with several models at once and append each reply as a labeled candidate
+    Type: string
+    Default: None
+    flag: fanout
+    short:
+    argument: fanout
+    argument_check: is_model_list
+    """
+    spec = args.fanout or ("" if args.non_interactive else content_input(
+        f"Models to compare, separated by spaces or commas: {', '.join(full_model_choices)}"
+    ))
+    args.fanout = None
+    models = [model for model in spec.replace(",", " ").split() if model]
+    unknown = [model for model in models if model not in full_model_choices]
+    if unknown or not models:
+        Colors.print_colored(f"fanout: unknown or missing models {', '.join(unknown)}".rstrip(), Colors.RED)
+        return messages
+
+    buffers: Dict[str, List[str]] = {model: [] for model in models}
+    started = time.perf_counter()
+    finished: Dict[str, float] = {}
+
+    def run(model: str) -> Optional[Dict[str, Any]]:
+        model_args = copy.copy(args)
+        model_args.model = model
+        try:
+            return run_completion(messages, model_args, buffers[model].append, priority=rate_limit.INTERACTIVE)
+        finally:
+            finished[model] = time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=len(models), thread_name_prefix="llt-fanout") as executor:
+        futures = {model: executor.submit(run, model) for model in models}
+        pending = set(futures.values())
+        while pending:
+            _, pending = wait(pending, timeout=0.25)
+            if sys.stdout.isatty():
+                status = " | ".join(
+                    f"{model} {sum(map(len, buffers[model]))} chars"
+                    + (f" {finished[model]:.1f}s" if model in finished else "")
+                    for model in models
+                )
+                print(f"\r{status[:shutil.get_terminal_size().columns - 1]}", end="", flush=True)
+        print("\r")
+
+    kept = []
+    for model, future in futures.items():
+        header = f"--- {model} ({finished[model]:.1f}s) ---"
+        if future.exception() or future.result() is None:
+            Colors.print_colored(f"{header} failed: {future.exception() or 'not sent'}", Colors.RED)
+            continue
+        Colors.print_colored(header, Colors.CYAN)
+        print(future.result()["content"])
+        kept.append({**future.result(), CANDIDATE_LABEL: model})
+    Colors.print_colored(
+        f"{len(kept)} candidate(s) in {time.perf_counter() - started:.1f}s "
+        f"(slowest {max(finished.values()):.1f}s, sum {sum(finished.values()):.1f}s)",
+        Colors.GREEN
+    )
+
+    if len(kept) > 1 and not args.non_interactive:
+        labels = [candidate[CANDIDATE_LABEL] for candidate in kept]
+        choice = ""
+        while choice not in labels + ["all"]:  # no default: Enter must not keep every candidate
+            choice = list_input(labels + ["all"], f"Keep which candidate ({', '.join(labels)} or all)").strip()
+        kept = [candidate for candidate in kept if choice in ("all", candidate[CANDIDATE_LABEL])]
+    for candidate in kept:
+        messages.append(candidate)
+    return messages
+
+
+def is_ll_glob(pattern: str) -> bool:
+    return " " not in pattern and (glob.has_magic(pattern) or pattern.endswith(".ll"))
+
+
+@llt
+def batch(messages: List[Message], args: Dict, index: int = -1) -> List[Message]:
+    """
+    Description: Load, complete and write every .ll file matching a glob under ll_dir, e.g. "evals/**/*.ll"
+    Type: string
+    Default: None
+    flag: batch
+    short:
+    argument: batch
+    argument_check: is_ll_glob
+    """
+    pattern = args.batch or content_input(f"Glob of .ll files under {args.ll_dir}")
+    args.batch = None
+    paths = sorted(
+        path for path in glob.glob(os.path.join(args.ll_dir, pattern), recursive=True)
+        if os.path.isfile(path)
+    )
+    if not paths:
+        Colors.print_colored(f"batch: no files match '{pattern}' under {args.ll_dir}", Colors.RED)
+        return messages
+
+    def process(path: str) -> Optional[int]:
+        conversation = journal.read_messages(path)
+        # resume: files already ending in a reply were completed by an earlier run
+        if not conversation or conversation[-1]["role"] == "assistant":
+            return None
+        completion = run_completion(
+            conversation, args, on_text=lambda text: None, raise_errors=True, priority=rate_limit.BATCH
+        )
+        if completion is None:
+            raise ValueError("conversation does not fit the context window")
+        conversation.append(completion)
+        journal.write_messages(path, conversation, getattr(args, "journal", False))
+        return token_ledger.count_message(completion, args.model)
+
+    def on_result(path: str, outcome: str, report: batch_runner.BatchReport) -> None:
+        finished = report.done + report.skipped + len(report.failed)
+        color = {"done": Colors.GREEN, "skipped": Colors.YELLOW}.get(outcome, Colors.RED)
+        Colors.print_colored(f"[{finished}/{report.total}] {os.path.relpath(path, args.ll_dir)}: {outcome}", color)
+
+    Colors.print_colored(
+        f"Completing {len(paths)} file(s) with {args.model} on {args.batch_workers} worker(s)...", Colors.CYAN
+    )
+    report = batch_runner.run_batch(
+        paths, process, args.batch_workers, args.batch_retries, on_result=on_result
+    )
+    Colors.print_colored(f"Batch: {report.summary()}", Colors.BOLD)
+    for path, error in report.failed[:10]:
+        Colors.print_colored(f"  {os.path.relpath(path, args.ll_dir)}: {error}", Colors.RED)
+    return messages
+
+
+@llt
+def hedges(messages: List[Message], args: Dict, index: int = -1) -> List[Message]:
+    """
+    Description: Show how often hedged completions fired and how often the backup won
+    Type: bool
+    Default: false
+    flag: hedges
+    short:
+    """
+    stats = hedging.load_stats()
+    if not stats:
+        Colors.print_colored("No hedged completions recorded (enable with --hedge and a hedging section in config.yaml).", Colors.YELLOW)
+    for pair, entry in sorted(stats.items()):
+        fired = f"{100 * entry['fired'] / entry['requests']:.1f}%" if entry["requests"] else "-"
+        won = f"{100 * entry['backup_won'] / entry['fired']:.1f}%" if entry["fired"] else "-"
+        print(f"{Colors.BOLD}{pair}{Colors.RESET}: {entry['requests']} request(s), "
+              f"hedge fired {entry['fired']} ({fired}), backup won {entry['backup_won']} ({won} of fired)")
+    return messages
+
+
+@llt
+def routes(messages: List[Message], args: Dict, index: int = -1) -> List[Message]:
+    """
+    Description: Show model aliases with the rolling latency, error rate and circuit state of each target
+    Type: bool
+    Default: false
+    flag: routes
+    short:
+    """
+    if not routing.aliases():
+        Colors.print_colored("No model aliases configured (add an aliases section to config.yaml).", Colors.YELLOW)
+    now = time.time()
+    for alias, targets in routing.aliases().items():
+        print(f"{Colors.BOLD}{alias}{Colors.RESET} -> {routing.choose(alias, now)}")
+        for target in targets:
+            stats = routing.summary(target)
+            ttft = f"{stats['ttft']:.2f}s" if stats["ttft"] is not None else "-"
+            tps = f"{stats['tps']:.1f}" if stats["tps"] else "-"
+            state = f"open {stats['open_until'] - now:.0f}s" if stats["open_until"] > now else "closed"
+            print(f"  {target:28} ttft {ttft:>7}  tok/s {tps:>7}  errors {100 * stats['error_rate']:5.1f}%"
+                  f"  samples {stats['samples']:3}  circuit {state}")
+    return messages
+
+
+def is_cache_action(action: str) -> bool:
+    return action in ("stats", "clear")
+
+
+@llt
+def cache(messages: List[Message], args: Dict, index: int = -1) -> List[Message]:
+    """
+    Description: Completion cache statistics, or "clear" to empty it (enable with --completion_cache)
+    Type: string
+    Default: None
+    flag: cache
+    short:
+    argument: cache
+    argument_check: is_cache_action
+    """
+    action, args.cache = (args.cache or "stats").strip(), None
+    if completion_cache.cache_dir() is None:
+        Colors.print_colored("The completion cache needs LLT_PATH.", Colors.RED)
+    elif action == "clear":
+        Colors.print_colored(f"Removed {completion_cache.clear()} cached completion(s).", Colors.GREEN)
+    elif action == "stats":
+        stats = completion_cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+        rate = f"{100 * stats['hits'] / lookups:.1f}%" if lookups else "-"
+        state = "on" if getattr(args, "completion_cache", False) else "off (use --completion_cache)"
+        print(f"{Colors.BOLD}Completion cache{Colors.RESET} {completion_cache.cache_dir()}, {state}")
+        print(f"  hits {stats['hits']}, misses {stats['misses']}, hit rate {rate}")
+        print(f"  stored {stats['stores']}, evicted {stats['evictions']}, size {stats['bytes'] / 1024:.1f} KiB")
     else:
-        completion = send_request(completion_url, api_key, messages, args)
+        Colors.print_colored(f"Unknown cache action '{action}'; use stats or clear.", Colors.RED)
+    return messages
 
-    messages.append(completion)
+
+def is_window(spec: str) -> bool:
+    try:
+        metrics.parse_window(spec)
+    except ValueError:
+        return False
+    return True
+
+
+@llt
+def perf(messages: List[Message], args: Dict, index: int = -1) -> List[Message]:
+    """
+    Description: Latency percentiles per provider and model over a window such as 30m, 24h or 7d
+    Type: string
+    Default: None
+    flag: perf
+    short:
+    argument: perf
+    argument_check: is_window
+    """
+    spec, args.perf = (args.perf or "24h").strip(), None
+    try:
+        window = metrics.parse_window(spec)
+    except ValueError:
+        Colors.print_colored(f"Unknown window '{spec}'; use e.g. 30m, 24h or 7d.", Colors.RED)
+        return messages
+    if metrics.db_path() is None:
+        Colors.print_colored("Completion metrics need LLT_PATH.", Colors.RED)
+        return messages
+    summaries = metrics.summarize(window)
+    if not summaries:
+        Colors.print_colored(f"No completions recorded in the last {spec}.", Colors.YELLOW)
+
+    def triple(summary: Dict[str, Any], name: str, scale: float = 1000.0, unit: str = "ms") -> str:
+        values = [summary[f"{name}_p{q}"] for q in (50, 95, 99)]
+        return "/".join("-" if value is None else f"{value * scale:.0f}" for value in values) + f" {unit}"
+
+    print(f"{Colors.BOLD}Completions in the last {spec}{Colors.RESET} (p50/p95/p99; tok/s shows the slow tail)")
+    for summary in summaries:
+        errors = 100 * summary["errors"] / summary["count"]
+        print(f"{Colors.BOLD}{summary['provider']}/{summary['model']}{Colors.RESET}"
+              f"  {summary['count']} completions, {errors:.1f}% errors, {summary['tokens']:,} output tokens")
+        print(f"  connect {triple(summary, 'connect'):>20}  ttft {triple(summary, 'ttft'):>20}")
+        print(f"  itl     {triple(summary, 'itl'):>20}  tok/s {triple(summary, 'tps', 1.0, ''):>19}")
     return messages
 
 
@@ -237,7 +711,7 @@ def suggest_tool(messages: List[Message], args: Dict, index: int = -1) -> List[M
     Default: false
     flag: suggest_tool
     """
-    anthropic_client = anthropic.Client()
+    anthropic_client = http_clients.anthropic_client()
 
     last_messages = messages[-3:] if len(messages) > 3 else messages
     conversation_context = "\n".join([
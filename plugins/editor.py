@@ -7,6 +7,8 @@ from typing import List, Dict, Optional, Callable, Iterator, Union
 from pathlib import Path
 
 from plugins import llt
+from message import Message
+import blobs
 from utils import path_input, get_valid_index, confirm_action
 from utils import Colors
 from utils import (
@@ -19,9 +21,11 @@ from utils import TempFileManager
 from utils import BackupManager
 from utils import encode_image_to_base64, content_input, list_input
 from utils import get_project_dir
+from profiler import startup_profiler
 
 temp_manager = TempFileManager()
-backup_manager = BackupManager()
+with startup_profiler.phase("editor: BackupManager()", "module"):
+    backup_manager = BackupManager()
 
 
 def iter_blocks(
@@ -267,7 +271,7 @@ def content(messages: List[Dict], args: Dict, index: int = -1) -> List[Dict]:
             if new_content != messages[msg_index]["content"]:
                 if getattr(args, 'backup', True):
                     backup_manager.create_backup(temp_path)
-                messages[msg_index]["content"] = new_content
+                messages[msg_index] = Message(messages[msg_index], content=new_content)
 
         except Exception as e:
             Colors.print_colored(f"Error editing content: {e}", Colors.RED)
@@ -348,23 +352,18 @@ def file_include(messages: List[Dict], args: Dict, index: int = -1) -> List[Dict
     if ext.lower() in [".png", ".jpeg", ".jpg", ".gif", ".webp"]:
         prompt = args.prompt if args.non_interactive else content_input()
         try:
-            encoded_image = encode_image_to_base64(file_path)
+            # stored once under LLT_PATH/blobs; inline base64 only without a blob store
+            image_data = blobs.put_file(file_path) or encode_image_to_base64(file_path)
         except Exception as e:
             print(f"Failed to encode image: {e}")
             return messages
 
+        media_type = f"image/{ext[1:].lower()}"
         if args.model.startswith("claude"):
             messages.append({
                 "role": "user",
                 "content": [
-                    {
-                        "type": "image",
-                        "source": {
-                            "type": "base64",
-                            "media_type": f"image/{ext[1:].lower()}",
-                            "data": encoded_image,
-                        },
-                    },
+                    blobs.image_part(image_data, media_type, "anthropic"),
                     {"type": "text", "text": prompt},
                 ],
             })
@@ -373,12 +372,7 @@ def file_include(messages: List[Dict], args: Dict, index: int = -1) -> List[Dict
                 "role": "user",
                 "content": [
                     {"type": "text", "text": prompt},
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/{ext[1:].lower()};base64,{encoded_image}"
-                        },
-                    },
+                    blobs.image_part(image_data, media_type, "openai"),
                 ],
             })
         else:
@@ -0,0 +1,243 @@
+# plugins/search.py
+# Full-text search over every conversation under ll_dir.
+#
+# The index is an SQLite FTS5 table in $LLT_PATH/search.db with one row per
+# message (role, code-block languages, filenames, text). A message's rowid is
+# (file id << 20) + message index, so a file's rows are one rowid range;
+# files with more messages than that are not indexed.
+# Files are re-indexed only when their size/mtime changed and their content
+# hash differs.
+
+import os
+import re
+import sqlite3
+import hashlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from plugins import llt
+from message import Message
+from utils import Colors, list_input, parse_markdown_for_codeblocks
+import journal
+import ll_codecs
+
+INDEX_VERSION = 1
+IDX_BITS = 20
+CONVERSATION_EXTENSIONS = (".ll",) + tuple(codec.extension for codec in ll_codecs.CODECS.values())
+_HEADER_FILENAME = re.compile(r"^# (\S+\.\w+)$", re.MULTILINE)  # file_include headers
+_QUERY_TERM = re.compile(r'(?:(\w+):)?("[^"]*"|\S+)')
+_COLUMNS = {"role": "role", "lang": "languages", "file": "filenames"}
+
+
+def index_path() -> str:
+    return os.path.join(os.getenv("LLT_PATH", ""), "search.db")
+
+
+def connect(path: Optional[str] = None) -> sqlite3.Connection:
+    db = sqlite3.connect(path or index_path())
+    if db.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+        db.executescript("""
+            DROP TABLE IF EXISTS files;
+            DROP TABLE IF EXISTS messages;
+            CREATE TABLE files (
+                id INTEGER PRIMARY KEY, path TEXT UNIQUE, size INTEGER, mtime_ns INTEGER, digest TEXT
+            );
+            CREATE VIRTUAL TABLE messages USING fts5(
+                role, languages, filenames, text,
+                tokenize = "unicode61 tokenchars '_'"
+            );
+        """)
+        db.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+        db.commit()
+    return db
+
+
+def message_text(message: Message) -> str:
+    content = message.get("content")
+    if isinstance(content, list):
+        return "\n".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content if isinstance(content, str) else ""
+
+
+def message_row(rowid: int, message: Message) -> Tuple:
+    text = message_text(message)
+    blocks = parse_markdown_for_codeblocks(text) if "```" in text else []
+    languages = {block["language"] for block in blocks}
+    filenames = {block["filename"] for block in blocks if block["filename"]}
+    filenames.update(_HEADER_FILENAME.findall(text))
+    return (rowid, message.get("role", ""), " ".join(sorted(languages)), " ".join(sorted(filenames)), text)
+
+
+def conversation_files(ll_dir: str) -> Iterator[str]:
+    for root, dirs, files in os.walk(ll_dir):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in files:
+            if name.endswith(CONVERSATION_EXTENSIONS) and not name.startswith("."):
+                yield os.path.join(root, name)
+
+
+def file_digest(path: str) -> str:
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def _delete_rows(db: sqlite3.Connection, file_id: int) -> None:
+    db.execute("DELETE FROM messages WHERE rowid BETWEEN ? AND ?",
+               (file_id << IDX_BITS, ((file_id + 1) << IDX_BITS) - 1))
+
+
+def update_index(db: sqlite3.Connection, ll_dir: str) -> Dict[str, int]:
+    """Bring the index up to date with ll_dir. Returns counts of indexed/unchanged/removed files."""
+    ll_dir = os.path.abspath(ll_dir)
+    known = {
+        path: (size, mtime_ns, digest, file_id)
+        for file_id, path, size, mtime_ns, digest in db.execute(
+            "SELECT id, path, size, mtime_ns, digest FROM files WHERE substr(path, 1, ?) = ?",
+            (len(ll_dir) + 1, ll_dir + os.sep)
+        )
+    }
+    stats = {"indexed": 0, "unchanged": 0, "removed": 0}
+    for path in conversation_files(ll_dir):
+        stat = os.stat(path)
+        previous = known.pop(path, None)
+        if previous and previous[:2] == (stat.st_size, stat.st_mtime_ns):
+            stats["unchanged"] += 1
+            continue
+        digest = file_digest(path)
+        if previous and previous[2] == digest:
+            db.execute("UPDATE files SET size = ?, mtime_ns = ? WHERE id = ?", (stat.st_size, stat.st_mtime_ns, previous[3]))
+            stats["unchanged"] += 1
+            continue
+        try:
+            messages = journal.read_messages(path)
+        except Exception as e:
+            Colors.print_colored(f"Skipping {path}: {e}", Colors.YELLOW)
+            continue
+        if len(messages) > 1 << IDX_BITS:
+            Colors.print_colored(f"Skipping {path}: more than {1 << IDX_BITS} messages", Colors.YELLOW)
+            continue
+        if previous:
+            file_id = previous[3]
+            _delete_rows(db, file_id)
+            db.execute("UPDATE files SET size = ?, mtime_ns = ?, digest = ? WHERE id = ?",
+                       (stat.st_size, stat.st_mtime_ns, digest, file_id))
+        else:
+            file_id = db.execute("INSERT INTO files (path, size, mtime_ns, digest) VALUES (?, ?, ?, ?)",
+                                 (path, stat.st_size, stat.st_mtime_ns, digest)).lastrowid
+        db.executemany(
+            "INSERT INTO messages (rowid, role, languages, filenames, text) VALUES (?, ?, ?, ?, ?)",
+            (message_row((file_id << IDX_BITS) + i, m) for i, m in enumerate(messages))
+        )
+        stats["indexed"] += 1
+    for *_, file_id in known.values():
+        _delete_rows(db, file_id)
+        db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+        stats["removed"] += 1
+    db.commit()
+    return stats
+
+
+def query_terms(query: str) -> List[Tuple[str, str]]:
+    """(column, term) pairs; a prefix that names no column stays part of the term, e.g. "http://x"."""
+    return [(column, term) if column in _COLUMNS or not column else ("", f"{column}:{term}")
+            for column, term in _QUERY_TERM.findall(query)]
+
+
+def fts_query(query: str) -> str:
+    """
+    Translate a user query into FTS5 syntax. Terms are ANDed; "quoted phrases",
+    prefix* terms and role:/lang:/file: column filters are supported.
+    """
+    terms = []
+    for column, term in query_terms(query):
+        prefix = term.endswith("*") and not term.startswith('"')
+        phrase = '"' + term.strip('"*').replace('"', '""') + '"' + ("*" if prefix else "")
+        if column in _COLUMNS:
+            phrase = f"{_COLUMNS[column]} : {phrase}"
+        terms.append(phrase)
+    return " AND ".join(terms)
+
+
+def is_inline_query(query: str) -> bool:
+    """
+    Whether "search <query>" is a search rather than a message starting with
+    "search": filters, prefix* terms and quoted phrases, with at most one plain
+    word. Longer queries are typed at the prompt of a bare "search".
+    """
+    plain = [term for column, term in query_terms(query)
+             if not column and not term.startswith('"') and not term.endswith("*")]
+    return len(plain) <= 1
+
+
+def search_index(db: sqlite3.Connection, query: str, ll_dir: str, limit: int = 20) -> List[Tuple[str, int, str]]:
+    """Ranked (file, message index, snippet) hits under ll_dir."""
+    match = fts_query(query)
+    if not match:
+        return []
+    prefix = os.path.abspath(ll_dir) + os.sep
+    rows = db.execute(
+        """
+        SELECT files.path, messages.rowid, snippet(messages, 3, '[', ']', '...', 12)
+        FROM messages JOIN files ON files.id = messages.rowid >> ?
+        WHERE messages MATCH ? AND substr(files.path, 1, ?) = ?
+        ORDER BY bm25(messages, 1.0, 2.0, 4.0, 1.0)
+        LIMIT ?
+        """,
+        (IDX_BITS, match, len(prefix), prefix, limit)
+    )
+    mask = (1 << IDX_BITS) - 1
+    return [(path, rowid & mask, " ".join(snippet.split())) for path, rowid, snippet in rows]
+
+
+@llt
+def search(messages: List[Message], args: Dict, index: int = -1) -> List[Message]:
+    """
+    Description: Search all conversations in ll_dir and load a hit
+    Type: string
+    Default: None
+    flag: search
+    short:
+    argument: search
+    argument_check: is_inline_query
+    """
+    query = args.search or input("Search (role:, lang:, file: filters; prefix*): ")
+    args.search = None
+    if not query.strip():
+        return messages
+
+    db = connect()
+    try:
+        stats = update_index(db, args.ll_dir)
+        if stats["indexed"] or stats["removed"]:
+            Colors.print_colored(f"Index updated: {stats['indexed']} indexed, {stats['removed']} removed.", Colors.CYAN)
+        try:
+            hits = search_index(db, query, args.ll_dir)
+        except sqlite3.OperationalError as e:
+            Colors.print_colored(f"Invalid query: {e}", Colors.RED)
+            return messages
+    finally:
+        db.close()
+
+    if not hits:
+        Colors.print_colored("No matches.", Colors.YELLOW)
+        return messages
+    for n, (path, idx, snippet) in enumerate(hits, 1):
+        rel = os.path.relpath(path, args.ll_dir)
+        print(f"{Colors.YELLOW}{n:>3}{Colors.RESET} {Colors.CYAN}{rel}{Colors.RESET} #{idx + 1}: {snippet}")
+    if args.non_interactive:
+        return messages
+
+    selected = list_input([str(n) for n in range(1, len(hits) + 1)], "Select hit to load (enter to skip)")
+    if not selected.isdigit() or not 1 <= int(selected) <= len(hits):
+        return messages
+    path, idx, _ = hits[int(selected) - 1]
+    messages = journal.read_messages(path)
+    args.load = path
+    Colors.print_colored(f"Loaded {len(messages)} messages from '{path}'.", Colors.GREEN)
+    if idx < len(messages):
+        hit = messages[idx]
+        Colors.print_colored(f"[{hit['role'].capitalize()}] message {idx + 1} of {len(messages)}", Colors.MAGENTA)
+        print(message_text(hit))
+    return messages
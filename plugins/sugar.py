@@ -1,8 +1,11 @@
-from typing import List, Dict
+from typing import Any, Callable, List, Dict, Optional, Tuple
 import os
+import re
 import json
 from plugins import llt
-from utils import get_valid_index, content_input, list_input
+from message import Message
+from history import Conversation, LazyRecord
+from utils import get_valid_index, content_input, list_input, Colors
 from logger import llt_logger
 
 def load_xml_tags() -> List[str]:
@@ -22,6 +25,25 @@ def save_xml_tags(tags: List[str]) -> None:
     except Exception as e:
         llt_logger.log_error(f"Error saving XML tags: {e}")
 
+def map_text(message: Message, fn: Callable[[str], str]) -> Message:
+    """Apply fn to the text of a message (string content or text parts); images are left alone."""
+    content = message["content"]
+    if isinstance(content, str):
+        return Message(message, content=fn(content))
+    if isinstance(content, list):
+        return Message(message, content=[
+            {**part, "text": fn(part["text"])} if isinstance(part, dict) and part.get("type") == "text" else part
+            for part in content
+        ])
+    return message
+
+def wrap_text(text: str, tag_name: str) -> str:
+    return f"<{tag_name}>\n{text}\n</{tag_name}>"
+
+def indent_text(text: str, spaces: int) -> str:
+    prefix = ' ' * spaces
+    return '\n'.join(prefix + line for line in text.splitlines())
+
 @llt
 def xml_wrap(messages: List[Dict], args: Dict, index: int = -1) -> List[Dict]:
     """
@@ -45,7 +67,7 @@ def xml_wrap(messages: List[Dict], args: Dict, index: int = -1) -> List[Dict]:
     tag_name = tag_name or args.xml_wrap
     # Add new tag to list and save
     if tag_name:
-        messages[index]["content"] = f"<{tag_name}>\n{messages[index]['content']}\n</{tag_name}>"
+        messages[index] = map_text(messages[index], lambda text: wrap_text(text, tag_name))
         if tag_name not in existing_tags:
             existing_tags.append(tag_name)
             save_xml_tags(existing_tags)
@@ -58,7 +80,7 @@ def strip_trailing_newline(messages: List[Dict], args: Dict, index: int = -1) ->
     """Strip trailing newlines from message content."""
     if not args.non_interactive:
         index = get_valid_index(messages, "strip trailing newline", index)
-    messages[index]["content"] = messages[index]["content"].rstrip("\n")
+    messages[index] = map_text(messages[index], lambda text: text.rstrip("\n"))
     return messages
 
 @llt
@@ -67,9 +89,153 @@ def indent(messages: List[Dict], args: Dict, index: int = -1) -> List[Dict]:
     if not args.non_interactive:
         index = get_valid_index(messages, "indent content of", index)
     spaces = getattr(args, 'spaces', 4)
-    prefix = ' ' * spaces
-    
-    messages[index]["content"] = '\n'.join(
-        prefix + line for line in messages[index]["content"].splitlines()
+    messages[index] = map_text(messages[index], lambda text: indent_text(text, spaces))
+    return messages
+
+BULK_OPERATIONS = ("remove", "role", "xml", "indent", "strip", "sub")
+
+def _role_of(item: Any) -> str:
+    """Role without loading lazily indexed messages."""
+    return item.role if isinstance(item, LazyRecord) else item["role"]
+
+def _text_of(message: Message) -> str:
+    content = message["content"]
+    if isinstance(content, list):
+        return "\n".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content if isinstance(content, str) else ""
+
+def parse_selector(tokens: List[str], count: int) -> Callable[[int, Any], bool]:
+    """
+    Build a predicate over (index, stored item) from selector tokens. Index
+    tokens ("all", "7", "3-9", "12-", "-5" for the last five) are ORed;
+    role:, contains:, match: and longer: filters are ANDed with them.
+    """
+    ranges: List[range] = []
+    roles: List[str] = []
+    text_filters: List[Callable[[str], bool]] = []
+    for token in tokens:
+        kind, _, value = token.partition(":")
+        if token == "all":
+            ranges.append(range(count))
+        elif token.startswith("-") and token[1:].isdigit():
+            ranges.append(range(max(0, count - int(token[1:])), count))
+        elif re.fullmatch(r"\d+(-\d*)?", token):
+            first, _, last = token.partition("-")
+            if int(first) < 1:
+                raise ValueError(f"Invalid selector '{token}': message numbers start at 1")
+            end = (int(last) if last else count) if "-" in token else int(first)
+            ranges.append(range(int(first) - 1, min(count, end)))
+        elif kind == "role" and value:
+            roles.extend(value.split(","))
+        elif kind == "contains" and value:
+            text_filters.append(lambda text, value=value: value in text)
+        elif kind == "match" and value:
+            text_filters.append(re.compile(value).search)
+        elif kind == "longer" and value.isdigit():
+            text_filters.append(lambda text, n=int(value): len(text) > n)
+        else:
+            raise ValueError(f"Unknown selector '{token}'")
+
+    def selected(i: int, item: Any) -> bool:
+        if ranges and not any(i in r for r in ranges):
+            return False
+        if roles and _role_of(item) not in roles:
+            return False
+        if text_filters:
+            text = _text_of(item.load() if isinstance(item, LazyRecord) else item)
+            return all(f(text) for f in text_filters)
+        return True
+
+    return selected
+
+def parse_operation(name: str, rest: str) -> Callable[[Message], Optional[Message]]:
+    """
+    Transform for one message; returning None removes it. rest is the spec
+    after the operation name, as typed, so sub patterns keep their whitespace.
+    """
+    operands = rest.split()
+    if name == "remove" and not operands:
+        return lambda message: None
+    if name == "role" and len(operands) == 1:
+        return lambda message: Message(message, role=operands[0])
+    if name == "xml" and len(operands) == 1:
+        return lambda message: map_text(message, lambda text: wrap_text(text, operands[0]))
+    if name == "indent" and len(operands) <= 1:
+        spaces = int(operands[0]) if operands else 4
+        return lambda message: map_text(message, lambda text: indent_text(text, spaces))
+    if name == "strip" and not operands:
+        return lambda message: map_text(message, str.strip)
+    if name == "sub" and operands:
+        # sub /pattern/replacement/[i] with any delimiter, e.g. sub |\s+$||
+        expression = rest.strip()
+        delimiter = expression[0]
+        parts = expression[1:].split(delimiter)
+        if len(parts) == 3 and set(parts[2]) <= {"i", "m", "s"}:
+            flags = sum({"i": re.I, "m": re.M, "s": re.S}[f] for f in parts[2])
+            pattern, replacement = re.compile(parts[0], flags), parts[1]
+            return lambda message: map_text(message, lambda text: pattern.sub(replacement, text))
+    raise ValueError(f"Invalid operation '{' '.join([name, *operands])}'")
+
+def parse_bulk(spec: str, count: int) -> Tuple[Callable[[int, Any], bool], Callable[[Message], Optional[Message]]]:
+    """Selector predicate and transform of "<selectors> <operation> [operands]"."""
+    tokens = list(re.finditer(r"\S+", spec))
+    split = next((i for i, token in enumerate(tokens) if token.group() in BULK_OPERATIONS), None)
+    if split is None:
+        raise ValueError(f"No operation given; expected one of {', '.join(BULK_OPERATIONS)}")
+    if split == 0:
+        # a missing selector must not mean every message, e.g. "bulk remove"
+        raise ValueError("No selector given; use e.g. all, 3-9 or role:tool before the operation")
+    selected = parse_selector([token.group() for token in tokens[:split]], count)
+    return selected, parse_operation(tokens[split].group(), spec[tokens[split].end():])
+
+def is_bulk_spec(spec: str) -> bool:
+    """Whether "bulk <spec>" is a bulk command rather than a message starting with "bulk"."""
+    try:
+        parse_bulk(spec, 0)
+    except (ValueError, re.error):
+        return False
+    return True
+
+def apply_bulk(messages: List[Dict], spec: str) -> Tuple[Conversation, int]:
+    """
+    Apply "<selectors> <operation> [operands]" to every selected message in
+    one pass. Unselected messages are kept as stored, so lazily indexed
+    messages are only loaded when a text filter or the transform needs them.
+    """
+    items = messages.raw_items() if isinstance(messages, Conversation) else list(messages)
+    selected, transform = parse_bulk(spec, len(items))
+
+    result, changed = [], 0
+    for i, item in enumerate(items):
+        if not selected(i, item):
+            result.append(item)
+            continue
+        changed += 1
+        new = transform(item.load() if isinstance(item, LazyRecord) else item)
+        if new is not None:
+            result.append(new)
+    return Conversation(result), changed
+
+@llt
+def bulk(messages: List[Dict], args: Dict, index: int = -1) -> List[Dict]:
+    """
+    Description: Apply one operation to many messages, e.g. "role:tool 10-40 xml tool_output"
+    Type: string
+    Default: None
+    flag: bulk
+    short:
+    argument: bulk
+    argument_check: is_bulk_spec
+    """
+    spec = args.bulk or content_input(
+        "Enter '<selectors> <operation>': selectors all, 3, 3-9, -5, role:tool, contains:x, match:re, longer:N; "
+        "operations remove, role NAME, xml TAG, indent [N], strip, sub /pattern/replacement/[ims]"
     )
-    return messages
\ No newline at end of file
+    args.bulk = None
+    try:
+        result, changed = apply_bulk(messages, spec)
+    except (ValueError, re.error) as e:
+        Colors.print_colored(f"bulk: {e}", Colors.RED)
+        return messages
+    Colors.print_colored(f"Applied '{spec}' to {changed} message(s).", Colors.GREEN)
+    return result
@@ -8,6 +8,7 @@ from typing import List, Dict, Optional, Union, Tuple, Callable
 from urllib.parse import urlparse
 import json
 
+import http_clients
 from utils import get_valid_index, Colors
 from plugins import llt
 from logger import llt_logger
@@ -17,7 +18,7 @@ ContentBlock = namedtuple('ContentBlock', ['type', 'content', 'attributes'])
 
 def fetch_url(url: str) -> Optional[str]:
     try:
-        response = requests.get(url, timeout=10)
+        response = http_clients.session(url).get(url, timeout=http_clients.timeout(read="fetch_timeout"))
         response.raise_for_status()
         return response.text
     except requests.RequestException as e:
@@ -0,0 +1,87 @@
+# profiler.py
+# Startup/import-time profiling. Kept free of third-party imports so any
+# module, including plugins/__init__.py, can time itself cheaply.
+
+import json
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from typing import List, Dict, Optional, Iterator
+
+
+@dataclass
+class PhaseTiming:
+    name: str
+    category: str  # "phase", "plugin" or "module"
+    seconds: float
+    plugin: Optional[str] = None  # plugin module name for import timings
+
+
+def parse_budget(spec: Optional[str]) -> Dict[str, float]:
+    """
+    Parse a budget spec like "150,embeddings=1500,gmail=800" into
+    millisecond limits. A bare number sets the default for every plugin.
+    """
+    budget: Dict[str, float] = {}
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        if "=" in item:
+            name, limit = item.split("=", 1)
+            budget[name.strip()] = float(limit)
+        else:
+            budget["default"] = float(item)
+    return budget
+
+
+class StartupProfiler:
+    """Collect wall-clock timings for startup phases and plugin imports."""
+
+    def __init__(self):
+        self.timings: List[PhaseTiming] = []
+        self.start = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    @contextmanager
+    def phase(self, name: str, category: str = "phase", plugin: Optional[str] = None) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings.append(PhaseTiming(name, category, time.perf_counter() - started, plugin))
+
+    def finish(self) -> None:
+        """Mark the end of startup; the total excludes anything that runs later."""
+        if self.finished is None:
+            self.finished = time.perf_counter()
+
+    def over_budget(self, budget: Dict[str, float]) -> List[PhaseTiming]:
+        """Plugin imports slower than their limit (per plugin, else the default)."""
+        flagged = []
+        for timing in self.timings:
+            if timing.category != "plugin":
+                continue
+            limit = budget.get(timing.plugin, budget.get("default"))
+            if limit is not None and timing.seconds * 1000 > limit:
+                flagged.append(timing)
+        return flagged
+
+    def sorted_timings(self) -> List[PhaseTiming]:
+        return sorted(self.timings, key=lambda t: t.seconds, reverse=True)
+
+    def to_dict(self, budget: Optional[Dict[str, float]] = None) -> Dict:
+        flagged = self.over_budget(budget or {})
+        return {
+            "total_seconds": (self.finished or time.perf_counter()) - self.start,
+            "budget_ms": budget or {},
+            "timings": [asdict(t) for t in self.sorted_timings()],
+            "over_budget": [t.plugin for t in flagged],
+        }
+
+    def write_json(self, path: str, budget: Optional[Dict[str, float]] = None) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_dict(budget), f, indent=2)
+
+
+startup_profiler = StartupProfiler()
@@ -0,0 +1,203 @@
+# rate_limit.py
+# Per-provider request scheduling: token buckets, a concurrency cap and a
+# priority queue, so background jobs and batch workers stay under the quota
+# instead of provoking 429s and retrying into them.
+#
+# Limits come from the provider entries in config.yaml:
+#
+#   providers:
+#     openai:
+#       requests_per_minute: 500
+#       tokens_per_minute: 200000   # prompt + max_tokens, as providers count it
+#       max_concurrency: 8
+
+import time
+import heapq
+import itertools
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# lower runs first; equal priorities run in arrival order
+INTERACTIVE = 0
+BACKGROUND = 1
+BATCH = 2
+
+RETRY_AFTER_STATUS = {429, 503, 529}
+DEFAULT_RETRY_AFTER = 1.0  # pause after a 429 that names no delay
+
+
+class TokenBucket:
+    """Refills per_minute units evenly over a minute, holding at most per_minute."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount can be taken; more than capacity waits for a full bucket."""
+        self._refill(now)
+        needed = min(amount, self.capacity) - self.level
+        return max(0.0, needed / self.rate)
+
+    def take(self, amount: float, now: float) -> None:
+        # the level may go negative, so oversized requests are paid for afterwards
+        self._refill(now)
+        self.level -= amount
+
+    def give_back(self, amount: float) -> None:
+        self.level = min(self.capacity, self.level + amount)
+
+
+@dataclass
+class Ticket:
+    cost: int
+    priority: int
+    waited: float = 0.0
+    actual: Optional[int] = None  # set by the caller once the real cost is known
+
+
+class ProviderLimiter:
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_concurrency: Optional[int] = None
+    ):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_concurrency = int(max_concurrency) if max_concurrency else None
+        self.limited = bool(self.requests or self.tokens or self.max_concurrency)
+        self.active = 0
+        self.paused_until = 0.0
+        self.queue: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+    def _wait_time(self, entry: Tuple[int, int], cost: int) -> Optional[float]:
+        """0 when entry may go now; None to wait for a release; otherwise seconds to sleep."""
+        if self.queue[0] != entry:
+            return None
+        if self.max_concurrency and self.active >= self.max_concurrency:
+            return None
+        now = time.monotonic()
+        waits = [self.paused_until - now]
+        if self.requests:
+            waits.append(self.requests.wait_time(1, now))
+        if self.tokens:
+            waits.append(self.tokens.wait_time(cost, now))
+        return max(0.0, *waits)
+
+    def acquire(self, cost: int, priority: int = INTERACTIVE) -> Ticket:
+        ticket = Ticket(cost, priority)
+        started = time.monotonic()
+        with self._condition:
+            entry = (priority, next(self._sequence))
+            heapq.heappush(self.queue, entry)
+            try:
+                while True:
+                    wait = self._wait_time(entry, cost)
+                    if wait == 0:
+                        break
+                    self._condition.wait(wait)
+            except BaseException:
+                self.queue.remove(entry)
+                heapq.heapify(self.queue)
+                self._condition.notify_all()
+                raise
+            heapq.heappop(self.queue)
+            now = time.monotonic()
+            if self.requests:
+                self.requests.take(1, now)
+            if self.tokens:
+                self.tokens.take(cost, now)
+            self.active += 1
+            self._condition.notify_all()
+        ticket.waited = time.monotonic() - started
+        return ticket
+
+    def release(self, ticket: Ticket) -> None:
+        with self._condition:
+            self.active -= 1
+            if self.tokens and ticket.actual is not None and ticket.actual < ticket.cost:
+                self.tokens.give_back(ticket.cost - ticket.actual)
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, cost: int, priority: int = INTERACTIVE) -> Iterator[Ticket]:
+        """Hold a request slot for the duration of the block."""
+        if not self.limited and self.paused_until <= time.monotonic():
+            yield Ticket(cost, priority)
+            return
+        ticket = self.acquire(cost, priority)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every queued request for seconds, e.g. from a retry-after header."""
+        with self._condition:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self._condition.notify_all()
+
+    def note_error(self, error: BaseException) -> None:
+        delay = retry_after(error)
+        if delay is not None:
+            self.pause(delay)
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """
+    Delay a rate-limited or overloaded response asks for, from retry-after-ms
+    or retry-after (seconds or an HTTP date). None when the error is not one.
+    """
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    if status not in RETRY_AFTER_STATUS:
+        return None
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        pass
+    return DEFAULT_RETRY_AFTER if status == 429 else None
+
+
+_limits: Dict[str, Dict[str, Any]] = {}
+_limiters: Dict[str, ProviderLimiter] = {}
+_lock = threading.Lock()
+
+
+def configure(config: Dict[str, Any]) -> None:
+    with _lock:
+        _limits.clear()
+        _limiters.clear()
+        for provider, details in (config.get("providers") or {}).items():
+            _limits[provider] = {
+                key: details.get(key)
+                for key in ("requests_per_minute", "tokens_per_minute", "max_concurrency")
+            }
+
+
+def limiter_for(provider: str) -> ProviderLimiter:
+    """The shared limiter of provider, created on first use."""
+    with _lock:
+        if provider not in _limiters:
+            _limiters[provider] = ProviderLimiter(**_limits.get(provider, {}))
+        return _limiters[provider]
@@ -0,0 +1,168 @@
+# routing.py
+# Model aliases routed to the currently fastest healthy target.
+#
+# An alias in config.yaml names several concrete models, possibly on
+# different providers:
+#
+#   aliases:
+#     fast-chat: [deepseek-chat, gpt-4o-mini, claude-3-haiku]
+#
+# Every completion already stores its time to first token, tokens/sec and
+# whether it failed in $LLT_PATH/metrics.db, shared by every llt process; the
+# last WINDOW of those rows per model are the rolling samples, and an alias
+# resolves to the target with the lowest expected latency. A target whose
+# last FAILURE_THRESHOLD completions failed has its circuit open for a
+# cooldown that doubles with each further failure; after the cooldown one
+# trial request is let through (claimed in the trials table), and a success
+# closes the circuit again.
+
+import time
+import sqlite3
+import threading
+from statistics import median
+from typing import Any, Dict, List, Optional
+
+import metrics
+
+WINDOW = 50
+STALE_AFTER = 15 * 60  # seconds; targets without newer samples are tried again
+EXPECTED_TOKENS = 300  # reply length the latency estimate assumes
+DEFAULT_TOKENS_PER_SECOND = 50.0  # for targets whose replies were too short to measure
+FAILURE_THRESHOLD = 3
+COOLDOWN = 30.0
+MAX_COOLDOWN = 600.0
+
+_aliases: Dict[str, List[str]] = {}
+_db: Optional[sqlite3.Connection] = None
+_lock = threading.Lock()
+
+
+def configure(config: Dict[str, Any]) -> None:
+    _aliases.clear()
+    for alias, targets in (config.get("aliases") or {}).items():
+        _aliases[alias] = list(targets)
+
+
+def aliases() -> Dict[str, List[str]]:
+    return dict(_aliases)
+
+
+def is_alias(model: str) -> bool:
+    return model in _aliases
+
+
+def _connect() -> Optional[sqlite3.Connection]:
+    """The process's connection to metrics.db, opened on first use; call with _lock held."""
+    global _db
+    if _db is None and metrics.db_path() is not None:
+        metrics.connect().close()  # creates the completions table
+        # autocommit: every change is its own transaction unless BEGIN IMMEDIATE is used
+        db = sqlite3.connect(metrics.db_path(), timeout=5.0, check_same_thread=False, isolation_level=None)
+        db.execute("CREATE TABLE IF NOT EXISTS trials (model TEXT PRIMARY KEY, claimed REAL)")
+        _db = db
+    return _db
+
+
+def _samples(db: sqlite3.Connection, model: str) -> List[tuple]:
+    """(ts, ok, ttft, tokens/sec) of the last WINDOW completions of model, oldest first."""
+    return db.execute(
+        # replies without a first-token time (non-streaming providers) count their whole duration
+        "SELECT ts, ok, COALESCE(ttft, duration), tokens_per_second FROM completions "
+        "WHERE model = ? ORDER BY ts DESC LIMIT ?",
+        (model, WINDOW)
+    ).fetchall()[::-1]
+
+
+def _circuit(db: sqlite3.Connection, model: str, samples: List[tuple]) -> Dict[str, float]:
+    """Consecutive failures and when the circuit reopens, from the samples and a claimed trial."""
+    failures = 0
+    for _, ok, _, _ in reversed(samples):
+        if ok:
+            break
+        failures += 1
+    if failures < FAILURE_THRESHOLD:
+        return {"failures": failures, "open_until": 0.0, "cooldown": COOLDOWN}
+    # each failure past the threshold is a failed trial, which doubles the cooldown
+    cooldown = min(MAX_COOLDOWN, COOLDOWN * 2 ** (failures - FAILURE_THRESHOLD))
+    open_until = samples[-1][0] + cooldown
+    claimed = db.execute("SELECT claimed FROM trials WHERE model = ?", (model,)).fetchone()
+    if claimed and claimed[0] > samples[-1][0]:
+        # a trial is in flight: hold off others until it reports
+        open_until = max(open_until, claimed[0] + min(MAX_COOLDOWN, cooldown * 2))
+    return {"failures": failures, "open_until": open_until, "cooldown": cooldown}
+
+
+def summary(model: str) -> Dict[str, Any]:
+    """Rolling statistics of model: sample count, error rate, median TTFT and tokens/sec."""
+    with _lock:
+        db = _connect()
+        if db is None:
+            samples, circuit = [], {"failures": 0, "open_until": 0.0}
+        else:
+            samples = _samples(db, model)
+            circuit = _circuit(db, model, samples)
+    successes = [sample for sample in samples if sample[1]]
+    return {
+        "samples": len(samples),
+        "error_rate": 1 - len(successes) / len(samples) if samples else 0.0,
+        "ttft": median(sample[2] for sample in successes) if successes else None,
+        "tps": median(sample[3] for sample in successes if sample[3]) if any(s[3] for s in successes) else None,
+        "last": samples[-1][0] if samples else 0.0,
+        "open_until": circuit["open_until"],
+        "failures": circuit["failures"],
+    }
+
+
+def expected_latency(model: str, now: float) -> float:
+    """
+    Seconds an EXPECTED_TOKENS reply should take, inflated by the error rate
+    as retries would be. Unmeasured or stale targets score 0 so they are
+    tried, targets that have only failed score very high and open circuits
+    score infinity.
+    """
+    stats = summary(model)
+    if stats["open_until"] > now:
+        return float("inf")
+    if not stats["samples"] or now - stats["last"] > STALE_AFTER:
+        return 0.0
+    if stats["ttft"] is None:
+        return MAX_COOLDOWN * 10  # recent failures only: any measured target is better
+    latency = stats["ttft"] + EXPECTED_TOKENS / (stats["tps"] or DEFAULT_TOKENS_PER_SECOND)
+    return latency / max(0.05, 1 - stats["error_rate"])
+
+
+def choose(model: str, now: Optional[float] = None) -> str:
+    """The target resolve() would pick for model, without claiming a trial; for display."""
+    targets = _aliases.get(model)
+    if not targets:
+        return model
+    now = now or time.time()
+    scores = {target: expected_latency(target, now) for target in targets}
+    best = min(targets, key=lambda target: scores[target])
+    if scores[best] == float("inf"):
+        # every circuit is open: use the one that reopens first
+        best = min(targets, key=lambda target: summary(target)["open_until"])
+    return best
+
+
+def resolve(model: str) -> str:
+    """The target to use for model; concrete model names are returned as they are."""
+    now = time.time()
+    best = choose(model, now)
+    if best == model:
+        return best
+    with _lock:
+        db = _connect()
+        if db is None:
+            return best
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            circuit = _circuit(db, best, _samples(db, best))
+            if circuit["failures"] >= FAILURE_THRESHOLD and circuit["open_until"] <= now:
+                # half-open: this request is the trial
+                db.execute("INSERT OR REPLACE INTO trials VALUES (?, ?)", (best, now))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+    return best
@@ -0,0 +1,188 @@
+# sse.py
+# Incremental server-sent events parsing for streamed completions.
+#
+# SSEParser works on the raw byte chunks of a response as they arrive:
+# complete events are split off a bytearray buffer, so a line or an event may
+# straddle chunks, multi-line data fields are joined with "\n" and comment
+# lines (": ping" keep-alives) are skipped. ChatStream turns the events of an OpenAI-compatible
+# chat stream into text, tool calls, finish reason and usage.
+
+import json
+from collections import namedtuple
+from typing import Any, Dict, Iterable, List, Optional
+
+Event = namedtuple("Event", ["event", "data", "id"])
+_new_event = tuple.__new__  # skips namedtuple's Python-level __new__ on the hot path
+_scan_once = json.JSONDecoder().scan_once
+
+DONE = "[DONE]"
+
+
+def _loads(text: str) -> Any:
+    """json.loads without the whitespace regexes, for the compact JSON providers send."""
+    try:
+        value, end = _scan_once(text, 0)
+    except StopIteration:
+        return json.loads(text)  # raises a JSONDecodeError with position
+    return value if end == len(text) else json.loads(text)
+
+
+class SSEParser:
+    """Feed bytes, get complete events. Lines end in \n or \r\n."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._data: List[bytes] = []
+        self._event: Optional[str] = None
+        self._id: Optional[str] = None
+        self._crlf = False
+
+    def feed(self, chunk: bytes) -> List[Event]:
+        if self._crlf or b"\r" in chunk:
+            self._crlf = True
+            return self._feed_lines(chunk)
+        buffer = self._buffer
+        buffer += chunk
+        end = buffer.rfind(b"\n\n")
+        if end < 0:
+            return []
+        # split off the complete events in one go; the rest waits for more bytes
+        block = bytes(buffer[:end])
+        del buffer[:end + 2]
+        events = []
+        for raw in block.split(b"\n\n"):
+            if raw[:6] == b"data: " and b"\n" not in raw:
+                # the common single-line "data: ..." event
+                events.append(_new_event(Event, ("message", raw[6:].decode("utf-8"), self._id)))
+            else:
+                self._lines(raw.split(b"\n") + [b""], events)
+        return events
+
+    def _feed_lines(self, chunk: bytes) -> List[Event]:
+        buffer = self._buffer
+        buffer += chunk
+        end = buffer.rfind(b"\n")
+        if end < 0:
+            return []
+        block = bytes(buffer[:end + 1]).replace(b"\r\n", b"\n")
+        del buffer[:end + 1]
+        events: List[Event] = []
+        self._lines(block[:-1].split(b"\n"), events)
+        return events
+
+    def _lines(self, lines: List[bytes], events: List[Event]) -> None:
+        data = self._data
+        for line in lines:
+            if line[:6] == b"data: ":
+                data.append(line[6:])
+            elif not line:
+                if data:
+                    payload = data[0] if len(data) == 1 else b"\n".join(data)
+                    events.append(_new_event(Event, (self._event or "message", payload.decode("utf-8"), self._id)))
+                    data.clear()
+                self._event = None
+            elif line[0] == 0x3A:  # ":" comment, used for keep-alives
+                continue
+            else:
+                field, _, value = line.partition(b":")
+                if value[:1] == b" ":
+                    value = value[1:]
+                if field == b"data":
+                    data.append(value)
+                elif field == b"event":
+                    self._event = value.decode("utf-8")
+                elif field == b"id":
+                    self._id = value.decode("utf-8")
+
+
+class ChatStream:
+    """
+    Accumulates an OpenAI-compatible chat completion stream. Text deltas are
+    kept in a list and joined once; tool call fragments are merged by index.
+    """
+
+    def __init__(self):
+        self.parser = SSEParser()
+        self.text: List[str] = []
+        self.tool_calls: Dict[int, Dict[str, Any]] = {}
+        self.finish_reason: Optional[str] = None
+        self.usage: Optional[Dict[str, Any]] = None
+        self.deltas = 0  # delta events of text or tool call fragments
+        self.done = False
+
+    def feed(self, chunk: bytes) -> str:
+        """Parse a chunk of the response body and return the text it added."""
+        added = []
+        for event in self.parser.feed(chunk):
+            if event.data == DONE:
+                self.done = True
+                break
+            text = self.add(_loads(event.data))
+            if text:
+                added.append(text)
+        return "".join(added)
+
+    def add(self, payload: Dict[str, Any]) -> str:
+        """Merge one decoded chunk and return its text."""
+        usage = payload.get("usage")
+        if usage:
+            self.usage = usage
+        text = ""
+        for choice in payload.get("choices") or ():
+            if choice.get("index", 0):
+                continue
+            delta = choice.get("delta")
+            if delta:
+                text = delta.get("content") or delta.get("reasoning_content") or ""
+                if "tool_calls" in delta:
+                    for call in delta["tool_calls"] or ():
+                        self._add_tool_call(call)
+                    self.deltas += 1
+                elif text:
+                    self.deltas += 1
+            if choice.get("finish_reason"):
+                self.finish_reason = choice["finish_reason"]
+        if text:
+            self.text.append(text)
+        return text
+
+    def _add_tool_call(self, call: Dict[str, Any]) -> None:
+        entry = self.tool_calls.setdefault(
+            call.get("index", len(self.tool_calls)),
+            {"id": None, "type": "function", "name": [], "arguments": []}
+        )
+        if call.get("id"):
+            entry["id"] = call["id"]
+        function = call.get("function") or {}
+        if function.get("name"):
+            entry["name"].append(function["name"])
+        if function.get("arguments"):
+            entry["arguments"].append(function["arguments"])
+
+    def consume(self, chunks: Iterable[bytes], on_text=None) -> "ChatStream":
+        """
+        Feed chunks until [DONE] or the end of the stream, passing new text to
+        on_text. Chunks with only tool call fragments pass "", so the caller
+        still sees the reply progress.
+        """
+        for chunk in chunks:
+            deltas = self.deltas
+            text = self.feed(chunk)
+            if on_text and self.deltas != deltas:
+                on_text(text)
+            if self.done:
+                break
+        return self
+
+    def message(self) -> Dict[str, Any]:
+        message: Dict[str, Any] = {"role": "assistant", "content": "".join(self.text)}
+        if self.tool_calls:
+            message["tool_calls"] = [
+                {
+                    "id": entry["id"],
+                    "type": entry["type"],
+                    "function": {"name": "".join(entry["name"]), "arguments": "".join(entry["arguments"])},
+                }
+                for _, entry in sorted(self.tool_calls.items())
+            ]
+        return message
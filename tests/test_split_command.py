@@ -0,0 +1,54 @@
+import os
+import argparse
+import tempfile
+import unittest
+
+import plugins
+from plugins import init_cmd_map, load_plugins, split_command_argument
+
+PLUGIN_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "plugins")
+
+
+class SplitCommandArgumentTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.llt_path = tempfile.TemporaryDirectory()
+        os.environ["LLT_PATH"] = cls.llt_path.name
+        plugins._plugins_registry.clear()
+        load_plugins(PLUGIN_DIR)
+        cls.cmd_map = init_cmd_map()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.llt_path.cleanup()
+
+    def split(self, raw_cmd):
+        args = argparse.Namespace(view_spec=None, search=None, bulk=None)
+        return split_command_argument(self.cmd_map, raw_cmd, args), args
+
+    def test_full_name_with_valid_argument_splits(self):
+        name, args = self.split("view 1-20")
+        self.assertEqual((name, args.view_spec), ("view", "1-20"))
+        name, args = self.split("search lang:python")
+        self.assertEqual((name, args.search), ("search", "lang:python"))
+        name, args = self.split("bulk role:tool 10-40 xml tool_output")
+        self.assertEqual((name, args.bulk), ("bulk", "role:tool 10-40 xml tool_output"))
+
+    def test_sentences_stay_user_messages(self):
+        for text in ("search for the bug in parser.py", "view the code below", "bulk up the tests please",
+                     "bulk remove the old notes", "bulk remove"):
+            name, args = self.split(text)
+            self.assertEqual(name, text)
+            self.assertEqual((args.view_spec, args.search, args.bulk), (None, None, None))
+
+    def test_abbreviations_never_split(self):
+        for text in ("b remove the old notes", "v 1-20", "se lang:python"):
+            self.assertEqual(self.split(text)[0], text)
+
+    def test_bare_command_is_unchanged(self):
+        self.assertEqual(self.split("view")[0], "view")
+        self.assertEqual(self.split("search   ")[0], "search   ")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+# token_ledger.py
+# Cached per-message token counts with running totals.
+
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from history import Conversation, LazyRecord
+
+MESSAGE_OVERHEAD = 4  # role and separators per chat message
+IMAGE_TOKENS = 765  # a 1024x1024 image at high detail
+DEFAULT_ENCODING = "cl100k_base"
+
+# (encoding name, content key) -> token count
+_counts: Dict[Tuple[str, Any], int] = {}
+MAX_CACHED_COUNTS = 200_000
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str):
+    """tiktoken encoding for model, created once per model."""
+    import tiktoken  # deferred: only commands that count tokens pay for the import
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding(DEFAULT_ENCODING)
+
+
+def _value_key(value: Any) -> Any:
+    if isinstance(value, str):
+        return (hash(value), len(value))
+    if isinstance(value, Mapping):
+        return tuple((key, _value_key(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_value_key(item) for item in value)
+    return value
+
+
+def content_key(item: Any) -> Any:
+    """
+    Content hash of a message. Indexed messages use the digest stored in the
+    .ll index, so they need not be loaded; otherwise the str hash (computed
+    once and cached by Python on the string) and length of the text. List
+    content is keyed part by part the same way, so an inline image is not
+    copied into a repr on every call and a blob reference is its digest.
+    """
+    if isinstance(item, LazyRecord):
+        return item.digest
+    return _value_key(item["content"])
+
+
+def count_message(item: Any, model: str) -> int:
+    encoding = get_encoding(model)
+    key = (encoding.name, content_key(item))
+    count = _counts.get(key)
+    if count is None:
+        message = item.load() if isinstance(item, LazyRecord) else item
+        content = message["content"]
+        count = MESSAGE_OVERHEAD
+        if isinstance(content, str):
+            count += len(encoding.encode(content, disallowed_special=()))
+        elif isinstance(content, list):
+            for part in content:
+                if part.get("type") == "text":
+                    count += len(encoding.encode(part["text"], disallowed_special=()))
+                elif part.get("type") in ("image", "image_url"):
+                    count += IMAGE_TOKENS
+                elif part.get("type") == "tool_result" and isinstance(part.get("content"), str):
+                    count += len(encoding.encode(part["content"], disallowed_special=()))
+        if len(_counts) >= MAX_CACHED_COUNTS:
+            _counts.clear()
+        _counts[key] = count
+    return count
+
+
+class TokenLedger:
+    """
+    Per-message token counts and totals for one model, kept in step with a
+    conversation. update() diffs against the last seen snapshot, so only
+    appended, removed or edited messages are counted again.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self.snapshot = Conversation()
+        self.counts: List[int] = []
+        self.roles: List[str] = []
+        self.total = 0
+        self.by_role: Dict[str, int] = {}
+
+    def update(self, messages: Any) -> int:
+        """Bring the ledger up to date with messages and return the total."""
+        messages = Conversation(messages)
+        at, removed, items = self.snapshot.diff(messages, resolve=False)
+        new_counts = [count_message(item, self.model) for item in items]
+        new_roles = [item.role if isinstance(item, LazyRecord) else item["role"] for item in items]
+
+        for role, count in zip(self.roles[at:at + removed], self.counts[at:at + removed]):
+            self.by_role[role] -= count
+        for role, count in zip(new_roles, new_counts):
+            self.by_role[role] = self.by_role.get(role, 0) + count
+        self.total += sum(new_counts) - sum(self.counts[at:at + removed])
+        self.counts[at:at + removed] = new_counts
+        self.roles[at:at + removed] = new_roles
+        self.snapshot = messages.snapshot()
+        return self.total
+
+
+_ledgers: Dict[str, TokenLedger] = {}
+
+
+def ledger_for(model: str) -> TokenLedger:
+    if model not in _ledgers:
+        _ledgers[model] = TokenLedger(model)
+    return _ledgers[model]
+
+
+def count_tokens(messages: Any, model: Optional[str] = None) -> int:
+    """Total tokens of messages for model, reusing counts from earlier calls."""
+    return ledger_for(model or "gpt-4").update(messages)
@@ -10,7 +10,6 @@ import re
 import difflib
 import readline
 import base64
-import tiktoken
 import pyperclip
 from PIL import Image
 from math import ceil
@@ -318,7 +317,15 @@ def llt_input(plugin_keys: List[str], suggested_cmd: str = "") -> Tuple[str, int
     
     # Strip whitespace
     raw_cmd = raw_cmd.strip()
-    
+
+    # Trailing "&" runs the command as a background job, e.g. "complete&" or "url_fetch3 &"
+    if raw_cmd.endswith("&"):
+        cmd_name, index = parse_llt_command(raw_cmd[:-1].strip())
+        return f"{cmd_name}&", index
+    return parse_llt_command(raw_cmd)
+
+def parse_llt_command(raw_cmd: str) -> Tuple[str, int]:
+    """Split shell input into a command name and an optional message index."""
     if not raw_cmd:
         return "", -1
         
@@ -471,18 +478,10 @@ def is_base64(text: str) -> bool:
         return False
 
 def tokenize(messages: List[Dict[str, any]], args: Dict, index: int = -1) -> int:
-    """Count tokens in message content."""
-    content = ""
-    for msg in messages:
-        msg_content = msg["content"]
-        if isinstance(msg_content, str):
-            content += msg_content
-        elif isinstance(msg_content, list):
-            for c in msg_content:
-                if c.get("type") == "text":
-                    content += c["text"]
-    encoding = tiktoken.encoding_for_model(args.get("model","gpt-4"))
-    num_tokens = 4 + len(encoding.encode(content))
+    """Count tokens in message content, reusing cached per-message counts."""
+    from token_ledger import count_tokens  # token_ledger imports history, which imports utils
+
+    num_tokens = count_tokens(messages, getattr(args, "model", None))
     Colors.print_colored(f"Tokens used: {num_tokens}", Colors.BLUE)
     return num_tokens
 